@@ -1,8 +1,12 @@
+from django import forms
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 from .models import (
     BusinessProfile, GovernmentScheme, ApprovalType,
-    ApprovalApplication, ApplicationDocument, Compliance,
-    NewsArticle, DigitalSignature
+    ApprovalApplication, ApplicationStatusChange, ApplicationDocument, Compliance, ComplianceSchedule,
+    NewsArticle, DigitalSignature, ArchivedApplication, ArchivedDocument,
+    WebhookSubscription, WebhookDelivery
 )
 
 @admin.register(BusinessProfile)
@@ -12,25 +16,80 @@ class BusinessProfileAdmin(admin.ModelAdmin):
 
 @admin.register(GovernmentScheme)
 class GovernmentSchemeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'start_date', 'end_date', 'is_active')
-    list_filter = ('is_active',)
+    list_display = ('name', 'start_date', 'end_date', 'business_type', 'is_active')
+    list_filter = ('is_active', 'business_type')
     search_fields = ('name', 'description')
 
 @admin.register(ApprovalType)
 class ApprovalTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'department', 'processing_time', 'fees', 'is_active')
-    list_filter = ('department', 'is_active')
+    list_filter = ('department', 'business_type', 'is_active')
+
+class ApprovalApplicationAdminForm(forms.ModelForm):
+    class Meta:
+        model = ApprovalApplication
+        fields = '__all__'
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        if self.instance.pk and 'status' in self.changed_data:
+            original = self.initial['status']
+            if status not in ApprovalApplication.TRANSITIONS.get(original, set()):
+                raise forms.ValidationError(
+                    f"Cannot change status from '{original}' to '{status}'."
+                )
+        return status
+
+class ApplicationStatusChangeInline(admin.TabularInline):
+    model = ApplicationStatusChange
+    fields = ('from_status', 'to_status', 'changed_at', 'actor')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(ApprovalApplication)
 class ApprovalApplicationAdmin(admin.ModelAdmin):
-    list_display = ('application_number', 'business', 'approval_type', 'status', 'submission_date')
+    form = ApprovalApplicationAdminForm
+    list_display = ('application_number', 'business', 'approval_type', 'status', 'submission_date', 'claimed_by')
     list_filter = ('status', 'approval_type')
     search_fields = ('application_number', 'business__business_name')
+    inlines = [ApplicationStatusChangeInline]
+
+    def save_model(self, request, obj, form, change):
+        if change and 'status' in form.changed_data:
+            with transaction.atomic():
+                obj.transition_to(obj.status, actor=request.user, from_status=form.initial['status'])
+                # transition_to only writes the fields it manages.
+                other_fields = [name for name in form.changed_data if name != 'status']
+                if other_fields:
+                    obj.save(update_fields=other_fields)
+        else:
+            super().save_model(request, obj, form, change)
+
+@admin.register(ApplicationStatusChange)
+class ApplicationStatusChangeAdmin(admin.ModelAdmin):
+    list_display = ('application', 'from_status', 'to_status', 'changed_at', 'actor')
+    list_filter = ('to_status',)
+    list_select_related = ('application__approval_type', 'actor')
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 @admin.register(ApplicationDocument)
 class ApplicationDocumentAdmin(admin.ModelAdmin):
     list_display = ('application', 'document_type', 'is_verified', 'uploaded_at')
     list_filter = ('is_verified', 'document_type')
+    list_select_related = ('application__approval_type',)
 
 @admin.register(Compliance)
 class ComplianceAdmin(admin.ModelAdmin):
@@ -38,6 +97,12 @@ class ComplianceAdmin(admin.ModelAdmin):
     list_filter = ('is_completed',)
     search_fields = ('title', 'business__business_name')
 
+@admin.register(ComplianceSchedule)
+class ComplianceScheduleAdmin(admin.ModelAdmin):
+    list_display = ('title', 'frequency', 'day_of_month', 'business', 'business_type', 'is_active')
+    list_filter = ('frequency', 'business_type', 'is_active')
+    search_fields = ('title',)
+
 @admin.register(NewsArticle)
 class NewsArticleAdmin(admin.ModelAdmin):
     list_display = ('title', 'publish_date', 'is_active')
@@ -46,5 +111,53 @@ class NewsArticleAdmin(admin.ModelAdmin):
 
 @admin.register(DigitalSignature)
 class DigitalSignatureAdmin(admin.ModelAdmin):
-    list_display = ('user', 'document', 'signed_at', 'is_valid')
-    list_filter = ('is_valid',)
\ No newline at end of file
+    list_display = ('user', 'document', 'signed_at', 'is_valid', 'verified_at')
+    readonly_fields = ('document_sha256', 'signature', 'algorithm')
+    list_filter = ('is_valid',)
+    list_select_related = ('user', 'document__application')
+
+class ArchivedDocumentInline(admin.TabularInline):
+    model = ArchivedDocument
+    fields = ('document_type', 'document', 'is_verified', 'uploaded_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(ArchivedApplication)
+class ArchivedApplicationAdmin(admin.ModelAdmin):
+    list_display = ('application_number', 'business', 'approval_type', 'status', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('application_number',)
+    inlines = [ArchivedDocumentInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('url', 'business', 'approval_type', 'is_active', 'created_at')
+    list_filter = ('is_active', 'approval_type')
+    search_fields = ('url', 'business__business_name')
+    raw_id_fields = ('business',)
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('event', 'subscription', 'status', 'attempts', 'next_attempt_at', 'last_error')
+    list_filter = ('status',)
+    list_select_related = ('event', 'subscription')
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Retry selected deliveries now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='delivered').update(
+            status='pending', next_attempt_at=timezone.now(), claim_token=None)
+        self.message_user(request, f'{updated} deliveries queued for retry.')
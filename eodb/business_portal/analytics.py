@@ -0,0 +1,161 @@
+import math
+from itertools import chain
+
+from django.db import transaction
+
+from .models import ApplicationStatusChange, ApprovalApplication, ApprovalTypeStats, ArchivedApplication
+
+DECISION_STATUSES = ('approved', 'rejected')
+
+
+class QuantileSketch:
+    """
+    Quantile sketch with bounded relative error (DDSketch).
+
+    Values are counted in logarithmic buckets, so the state stays a small
+    dict no matter how many values are added and can be stored as JSON.
+    """
+
+    def __init__(self, relative_accuracy=0.01, state=None):
+        state = state or {}
+        self.relative_accuracy = state.get('accuracy', relative_accuracy)
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {int(k): v for k, v in state.get('bins', {}).items()}
+        self.zero_count = state.get('zero', 0)
+        self.count = state.get('count', 0)
+
+    def add(self, value):
+        self.count += 1
+        if value <= 1e-9:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other):
+        """Add another sketch's values; both must use the same accuracy."""
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_state(self):
+        return {
+            'accuracy': self.relative_accuracy,
+            'bins': {str(k): v for k, v in self.bins.items()},
+            'zero': self.zero_count,
+            'count': self.count,
+        }
+
+
+def processing_days(submitted, decided):
+    if not submitted or not decided:
+        return None
+    return max((decided - submitted).total_seconds(), 0) / 86400
+
+
+def apply_decisions(decisions):
+    """
+    Fold a stream of (approval_type_id, status, days) tuples into
+    ApprovalTypeStats. The stream is summed in memory first, bounded by the
+    number of approval types, then merged into each stats row under its
+    row lock, in approval type order, so concurrent folds (the statistics
+    job, archive_batch) neither lose updates nor deadlock.
+    """
+    deltas = {}
+    for approval_type_id, status, days in decisions:
+        delta = deltas.get(approval_type_id)
+        if delta is None:
+            delta = deltas[approval_type_id] = {'approved': 0, 'rejected': 0, 'sketch': QuantileSketch()}
+        delta['approved' if status == 'approved' else 'rejected'] += 1
+        if days is not None:
+            delta['sketch'].add(days)
+
+    with transaction.atomic():
+        for approval_type_id in sorted(deltas):
+            delta = deltas[approval_type_id]
+            stats, _ = ApprovalTypeStats.objects.select_for_update().get_or_create(approval_type_id=approval_type_id)
+            sketch = QuantileSketch(state=stats.sketch)
+            sketch.merge(delta['sketch'])
+            stats.decided_count += delta['approved'] + delta['rejected']
+            stats.approved_count += delta['approved']
+            stats.rejected_count += delta['rejected']
+            stats.sketch = sketch.to_state()
+            stats.median_days = sketch.quantile(0.5)
+            stats.p90_days = sketch.quantile(0.9)
+            stats.save()
+    return len(deltas)
+
+
+DECISION_FIELDS = ('id', 'to_status', 'changed_at', 'application__approval_type_id', 'application__submission_date')
+
+
+def uncounted_decisions():
+    return ApplicationStatusChange.objects.filter(stats_counted=False, to_status__in=DECISION_STATUSES)
+
+
+def fold_decisions(changes):
+    """Fold status changes (DECISION_FIELDS tuples) into the statistics and flag them counted."""
+    apply_decisions(
+        (type_id, status, processing_days(submitted, changed_at))
+        for _, status, changed_at, type_id, submitted in changes
+    )
+    ApplicationStatusChange.objects.filter(id__in=[c[0] for c in changes]).update(stats_counted=True)
+
+
+def update_processing_stats(batch_size=5000):
+    """
+    Incrementally fold decisions recorded since the last run into the
+    per-type statistics. Each decision in the status history is flagged
+    once counted, so one committed late with a lower id than decisions
+    already processed is still picked up, and none is counted twice.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            changes = list(
+                uncounted_decisions()
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('id')
+                .values_list(*DECISION_FIELDS)[:batch_size]
+            )
+            if not changes:
+                break
+            fold_decisions(changes)
+        processed += len(changes)
+    return processed
+
+
+def rebuild_processing_stats():
+    """
+    Recompute all statistics from ApprovalApplication and the archive, for
+    data decided before the status history existed, and mark the whole
+    history counted.
+    """
+    fields = ('approval_type_id', 'status', 'submission_date', 'approval_date', 'updated_at')
+    decisions = chain(
+        ApprovalApplication.objects.filter(status__in=DECISION_STATUSES).values_list(*fields).iterator(chunk_size=5000),
+        ArchivedApplication.objects.filter(status__in=DECISION_STATUSES).values_list(*fields).iterator(chunk_size=5000),
+    )
+    with transaction.atomic():
+        ApprovalTypeStats.objects.all().delete()
+        apply_decisions(
+            (type_id, status, processing_days(submitted, approved or updated))
+            for type_id, status, submitted, approved, updated in decisions
+        )
+        ApplicationStatusChange.objects.filter(stats_counted=False).update(stats_counted=True)
+    return ApprovalTypeStats.objects.count()
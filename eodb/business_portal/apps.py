@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class BusinessPortalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'business_portal'
\ No newline at end of file
+    name = 'business_portal'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .analytics import DECISION_FIELDS, fold_decisions, uncounted_decisions
+from .models import (
+    ApplicationDocument, ApplicationStatusChange, ApprovalApplication,
+    ArchivedApplication, ArchivedDocument, ArchivedSignature, DigitalSignature
+)
+
+CLOSED_STATUSES = ('approved', 'rejected')
+
+
+def closed_before(cutoff):
+    # Approved applications carry their decision date; rejected ones only
+    # have updated_at, which is set when the rejection is saved.
+    return ApprovalApplication.objects.filter(
+        Q(status='approved', approval_date__lt=cutoff) |
+        Q(status='rejected', updated_at__lt=cutoff)
+    )
+
+
+def archive_batch(application_ids):
+    """
+    Copy one batch of applications with their documents, signatures and
+    status history into the archive tables and delete the originals.
+    Files under MEDIA_ROOT are left where they are.
+    """
+    with transaction.atomic():
+        applications = list(ApprovalApplication.objects.filter(id__in=application_ids, status__in=CLOSED_STATUSES))
+        if not applications:
+            return 0
+        ids = [a.id for a in applications]
+
+        history = {}
+        for change in ApplicationStatusChange.objects.filter(application_id__in=ids).order_by('changed_at'):
+            history.setdefault(change.application_id, []).append({
+                'from': change.from_status,
+                'to': change.to_status,
+                'at': change.changed_at.isoformat(),
+                'actor': change.actor_id,
+            })
+
+        ArchivedApplication.objects.bulk_create([
+            ArchivedApplication(
+                id=a.id,
+                business_id=a.business_id,
+                approval_type_id=a.approval_type_id,
+                application_number=a.application_number,
+                status=a.status,
+                submission_date=a.submission_date,
+                approval_date=a.approval_date,
+                rejection_reason=a.rejection_reason,
+                notes=a.notes,
+                status_history=history.get(a.id, []),
+                created_at=a.created_at,
+                updated_at=a.updated_at,
+            )
+            for a in applications
+        ])
+        documents = list(ApplicationDocument.objects.filter(application_id__in=ids))
+        ArchivedDocument.objects.bulk_create([
+            ArchivedDocument(
+                id=d.id,
+                application_id=d.application_id,
+                document_type=d.document_type,
+                document=d.document.name,
+                is_verified=d.is_verified,
+                verification_notes=d.verification_notes,
+                uploaded_at=d.uploaded_at,
+            )
+            for d in documents
+        ])
+        ArchivedSignature.objects.bulk_create([
+            ArchivedSignature(
+                id=s.id,
+                user_id=s.user_id,
+                document_id=s.document_id,
+                signature_image=s.signature_image.name,
+                document_sha256=s.document_sha256,
+                signature=s.signature,
+                algorithm=s.algorithm,
+                signed_at=s.signed_at,
+                is_valid=s.is_valid,
+                verified_at=s.verified_at,
+            )
+            for s in DigitalSignature.objects.filter(document__application_id__in=ids)
+        ])
+        # The status history now lives in status_history, but decisions the
+        # statistics job has not seen yet would be lost with its rows.
+        # Locked so a concurrent statistics run cannot fold them as well.
+        fold_decisions(list(
+            uncounted_decisions().filter(application_id__in=ids)
+            .select_for_update(of=('self',)).values_list(*DECISION_FIELDS)
+        ))
+        # Cascades to documents, signatures, status changes and receipts.
+        ApprovalApplication.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_closed_applications(cutoff, batch_size=500, limit=None):
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        ids = list(closed_before(cutoff).order_by('id').values_list('id', flat=True)[:size])
+        if not ids:
+            break
+        archived += archive_batch(ids)
+    return archived
+
+
+def get_application_by_number(application_number, select_related=()):
+    """
+    Look up an application in the hot table first and fall back to the
+    archive. Raises ApprovalApplication.DoesNotExist when neither has it.
+    """
+    try:
+        return ApprovalApplication.objects.select_related(*select_related).get(application_number=application_number)
+    except ApprovalApplication.DoesNotExist:
+        try:
+            return ArchivedApplication.objects.select_related(*select_related).get(application_number=application_number)
+        except ArchivedApplication.DoesNotExist:
+            raise ApprovalApplication.DoesNotExist(application_number)
+
+
+def application_number_taken(application_number):
+    """Application numbers stay unique across the hot table and the archive."""
+    return (ApprovalApplication.objects.filter(application_number=application_number).exists() or
+            ArchivedApplication.objects.filter(application_number=application_number).exists())
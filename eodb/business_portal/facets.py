@@ -0,0 +1,221 @@
+import hashlib
+import time
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db.models import Case, CharField, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .models import BusinessProfile
+
+CACHE_TIMEOUT = 15 * 60
+VERSION_TTL = 60
+CLOSING_SOON_DAYS = 30
+
+FEE_BANDS = [
+    ('free', 'Free'),
+    ('upto_1000', 'Up to ₹1,000'),
+    ('upto_5000', '₹1,000 - ₹5,000'),
+    ('above_5000', 'Above ₹5,000'),
+]
+
+SCHEME_WINDOWS = [
+    ('open', 'Open'),
+    ('closing_soon', f'Closing within {CLOSING_SOON_DAYS} days'),
+    ('upcoming', 'Upcoming'),
+]
+
+
+FEE_BOUNDS = {
+    'free': (None, 0),
+    'upto_1000': (0, 1000),
+    'upto_5000': (1000, 5000),
+    'above_5000': (5000, None),
+}
+
+
+def fee_band(today):
+    return Case(
+        When(fees__lte=0, then=Value('free')),
+        When(fees__lte=1000, then=Value('upto_1000')),
+        When(fees__lte=5000, then=Value('upto_5000')),
+        default=Value('above_5000'),
+        output_field=CharField(),
+    )
+
+
+def fee_condition(value, today):
+    # Plain range lookups rather than the CASE above, so the fees index applies.
+    low, high = FEE_BOUNDS[value]
+    condition = Q()
+    if low is not None:
+        condition &= Q(fees__gt=low)
+    if high is not None:
+        condition &= Q(fees__lte=high)
+    return condition
+
+
+def scheme_window(today):
+    return Case(
+        When(start_date__gt=today, then=Value('upcoming')),
+        When(end_date__lte=today + timedelta(days=CLOSING_SOON_DAYS), then=Value('closing_soon')),
+        default=Value('open'),
+        output_field=CharField(),
+    )
+
+
+def window_condition(value, today):
+    soon = today + timedelta(days=CLOSING_SOON_DAYS)
+    if value == 'upcoming':
+        return Q(start_date__gt=today)
+    started = Q(start_date__lte=today)
+    if value == 'closing_soon':
+        return started & Q(end_date__gte=today, end_date__lte=soon)
+    return started & (Q(end_date__isnull=True) | Q(end_date__gt=soon))
+
+
+def field(name):
+    return lambda today: F(name)
+
+
+def equals(name):
+    return lambda value, today: Q(**{name: value})
+
+
+def relevant_to(value, today):
+    return Q(business_type=value) | Q(business_type__isnull=True) | Q(business_type='')
+
+
+class FacetSet:
+    """
+    The filterable dimensions of one catalog. Each dimension is
+    (title, bucket expression, choices, filter condition); the expression
+    groups rows for counting, the condition selects them for listing.
+    business_type is special in that a blank value means "relevant to
+    every business type".
+    """
+
+    def __init__(self, name, dimensions):
+        self.name = name
+        self.dimensions = dimensions
+
+    def expressions(self, today):
+        return {dim: build(today) for dim, (title, build, choices, condition) in self.dimensions.items()}
+
+    def parse(self, params):
+        selected = {}
+        for dim, (title, build, choices, condition) in self.dimensions.items():
+            value = params.get(dim)
+            if value and (choices is None or value in dict(choices)):
+                selected[dim] = value
+        return selected
+
+    def filter(self, queryset, selected, today=None):
+        if not selected:
+            return queryset
+        today = today or timezone.localdate()
+        for dim, value in selected.items():
+            queryset = queryset.filter(self.dimensions[dim][3](value, today))
+        return queryset
+
+    # Counts are cached per process, keyed on a version. With Redis the
+    # version is shared, so an invalidation from any process (a web worker
+    # saving a scheme, the expire_content command) reaches all of them.
+    # Otherwise it is local and expires after VERSION_TTL, which bounds how
+    # long another process's change goes unseen; a database round trip per
+    # request would cost more than the counts it saves. A new version starts
+    # from the clock rather than 1, so old counts are never picked up again.
+    def version_cache(self):
+        """The cache holding the version and how long it lives there."""
+        shared = caches['shared']
+        return (shared, None) if isinstance(shared, RedisCache) else (cache, VERSION_TTL)
+
+    def version(self):
+        store, timeout = self.version_cache()
+        return store.get_or_set(f'facets:{self.name}:version', time.time_ns, timeout)
+
+    def invalidate(self):
+        store, timeout = self.version_cache()
+        try:
+            store.incr(f'facets:{self.name}:version')
+        except ValueError:
+            store.set(f'facets:{self.name}:version', time.time_ns(), timeout)
+
+    def cube(self, queryset, today, version):
+        """
+        Item counts for every combination of dimension values, from one
+        GROUP BY query over the unfiltered catalog.
+        """
+        key = f'facets:{self.name}:{version}:{today.isoformat()}:cube'
+        rows = cache.get(key)
+        if rows is None:
+            dims = list(self.dimensions)
+            rows = [
+                (tuple(row[f'facet_{dim}'] or None for dim in dims), row['count'])
+                for row in queryset.order_by().annotate(
+                    **{f'facet_{dim}': expr for dim, expr in self.expressions(today).items()}
+                ).values(*[f'facet_{dim}' for dim in dims]).annotate(count=Count('id'))
+            ]
+            cache.set(key, rows, CACHE_TIMEOUT)
+        return rows
+
+    def counts(self, queryset, selected, today=None):
+        """
+        Counts per facet value, each taking every *other* selected filter
+        into account, as is usual for faceted navigation.
+        """
+        today = today or timezone.localdate()
+        digest = hashlib.md5(repr(sorted(selected.items())).encode()).hexdigest()
+        version = self.version()
+        key = f'facets:{self.name}:{version}:{today.isoformat()}:{digest}'
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        dims = list(self.dimensions)
+        rows = self.cube(queryset, today, version)
+
+        def matches(dim, row_value, value):
+            return row_value == value or (dim == 'business_type' and row_value is None)
+
+        result = {}
+        for i, dim in enumerate(dims):
+            others = {j: selected[d] for j, d in enumerate(dims) if d != dim and d in selected}
+            counts = {}
+            for values, count in rows:
+                if all(matches(dims[j], values[j], value) for j, value in others.items()):
+                    counts[values[i]] = counts.get(values[i], 0) + count
+            title, build, choices, condition = self.dimensions[dim]
+            if choices is None:
+                choices = sorted((value, value) for value in counts if value is not None)
+            general = counts.get(None, 0) if dim == 'business_type' else 0
+            options = []
+            for value, label in choices:
+                # Clicking a selected value clears it, any other value replaces it.
+                params = {d: v for d, v in selected.items() if d != dim}
+                if selected.get(dim) != value:
+                    params[dim] = value
+                options.append({
+                    'value': value,
+                    'label': label,
+                    'count': counts.get(value, 0) + general,
+                    'selected': selected.get(dim) == value,
+                    'query': urlencode(sorted(params.items())),
+                })
+            result[dim] = {'title': title, 'options': options}
+        cache.set(key, result, CACHE_TIMEOUT)
+        return result
+
+
+APPROVAL_TYPE_FACETS = FacetSet('approval_types', {
+    'department': ('Department', field('department'), None, equals('department')),
+    'fees': ('Fees', fee_band, FEE_BANDS, fee_condition),
+    'business_type': ('Business Type', field('business_type'), BusinessProfile.BUSINESS_TYPES, relevant_to),
+})
+
+SCHEME_FACETS = FacetSet('schemes', {
+    'window': ('Availability', scheme_window, SCHEME_WINDOWS, window_condition),
+    'business_type': ('Business Type', field('business_type'), BusinessProfile.BUSINESS_TYPES, relevant_to),
+})
@@ -62,6 +62,30 @@ class ApplicationDocumentForm(forms.ModelForm):
             'document': forms.FileInput(attrs={'class': 'form-control'}),
         }
 
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+class MultipleFileField(forms.FileField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_clean(d, initial) for d in data]
+        return [single_clean(data, initial)]
+
+class BulkDocumentUploadForm(forms.Form):
+    document_type = forms.ChoiceField(
+        choices=ApplicationDocument.DOCUMENT_TYPES,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    files = MultipleFileField(
+        widget=MultipleFileInput(attrs={'class': 'form-control', 'accept': '.pdf,.doc,.docx,.jpg,.jpeg,.png,.zip'}),
+        help_text='Select several files or a single ZIP archive'
+    )
+
 class ComplianceForm(forms.ModelForm):
     class Meta:
         model = Compliance
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .facets import SCHEME_FACETS
+from .models import GovernmentScheme, NewsArticle
+
+
+def expired_schemes(today):
+    return GovernmentScheme.objects.filter(is_active=True, end_date__lt=today)
+
+
+def stale_news(today, retention_days):
+    return NewsArticle.objects.filter(is_active=True, publish_date__lt=today - timedelta(days=retention_days))
+
+
+def expire_content(today=None, retention_days=None):
+    """
+    Deactivate schemes past their end_date and news older than the
+    retention window, one UPDATE per model. Returns (schemes, news).
+    """
+    today = today or timezone.localdate()
+    if retention_days is None:
+        retention_days = getattr(settings, 'NEWS_RETENTION_DAYS', 365)
+    now = timezone.now()
+    # updated_at moves too, so fragment caches keyed on it are not reused.
+    schemes = expired_schemes(today).update(is_active=False, updated_at=now)
+    news = stale_news(today, retention_days).update(is_active=False, updated_at=now)
+    if schemes:
+        # Bulk updates bypass the post_save signal that normally does this.
+        SCHEME_FACETS.invalidate()
+    return schemes, news
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from business_portal.archive import archive_closed_applications, closed_before
+
+
+class Command(BaseCommand):
+    help = 'Moves applications closed more than N months ago into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=None, help='Stop after archiving this many applications')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=30 * options['months'])
+        if options['dry_run']:
+            count = closed_before(cutoff).count()
+            self.stdout.write(f'{count} applications closed before {cutoff:%Y-%m-%d} would be archived')
+            return
+        archived = archive_closed_applications(cutoff, batch_size=options['batch_size'], limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} applications closed before {cutoff:%Y-%m-%d}'))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from business_portal.ratelimit import ratelimit
+
+
+class Command(BaseCommand):
+    help = 'Measures the per-request overhead of the API rate limiter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        factory = RequestFactory()
+        requests = [
+            factory.get('/api/status/APP-TEST/', REMOTE_ADDR=f'10.0.{i // 250 % 250}.{i % 250}')
+            for i in range(count)
+        ]
+
+        def view(request):
+            return HttpResponse()
+
+        limited = ratelimit(rate='1000000/s', scope='benchmark')(view)
+
+        start = time.perf_counter()
+        for request in requests:
+            view(request)
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for request in requests:
+            limited(request)
+        with_limiter = time.perf_counter() - start
+
+        overhead_us = (with_limiter - baseline) / count * 1e6
+        self.stdout.write(f'{count} requests, {len(set(r.META["REMOTE_ADDR"] for r in requests))} client IPs')
+        self.stdout.write(f'Without limiter: {baseline / count * 1e6:.2f} us/request')
+        self.stdout.write(f'With limiter:    {with_limiter / count * 1e6:.2f} us/request')
+        self.stdout.write(self.style.SUCCESS(f'Limiter overhead: {overhead_us:.2f} us/request'))
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from business_portal import review_queue
+from business_portal.models import ApprovalApplication
+
+
+class Command(BaseCommand):
+    help = ('Drains the review queue with concurrent reviewer threads, checks that no application '
+            'is claimed twice, then releases every claim it made')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviewers', type=int, default=24)
+        parser.add_argument('--batch', type=int, default=5)
+        parser.add_argument('--department', default=None)
+        parser.add_argument('--user', required=True, help='Staff username the claims are made as')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(f"No staff user named {options['user']}")
+
+        claims = []
+        errors = []
+        lock = threading.Lock()
+
+        def reviewer():
+            try:
+                while True:
+                    claimed = review_queue.claim(user, count=options['batch'], department=options['department'])
+                    if not claimed:
+                        break
+                    with lock:
+                        claims.extend(a.id for a in claimed)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=reviewer) for _ in range(options['reviewers'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        released = ApprovalApplication.objects.filter(id__in=claims, claimed_by=user).update(
+            claimed_by=None, lease_expires_at=None, lease_token=None,
+        )
+        duplicates = len(claims) - len(set(claims))
+        self.stdout.write(f'{options["reviewers"]} reviewers claimed {len(claims)} applications '
+                          f'in {elapsed:.2f}s ({len(claims) / elapsed if elapsed else 0:.0f}/s)')
+        self.stdout.write(f'Released {released} claims')
+        for exc in errors:
+            self.stderr.write(f'Reviewer failed: {exc!r}')
+        if duplicates:
+            raise CommandError(f'{duplicates} applications were claimed more than once')
+        self.stdout.write(self.style.SUCCESS('No application was claimed twice'))
@@ -0,0 +1,131 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, reverse
+
+from business_portal import urls
+from business_portal.models import (
+    ApprovalApplication, ApplicationDocument, ApprovalType,
+    Compliance, GovernmentScheme, NewsArticle
+)
+from business_portal.warmup import template_names
+
+
+class Command(BaseCommand):
+    help = 'Measures cold and warm render time of every business_portal page that renders a template'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='business1', help='Username to render logged-in pages as')
+        parser.add_argument('--staff-user', help='Username to render staff pages as (default: the first staff user)')
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def url_kwargs(self, user):
+        application = ApprovalApplication.objects.filter(business__user=user).first()
+        document = ApplicationDocument.objects.filter(application__business__user=user).first()
+        compliance = Compliance.objects.filter(business__user=user).first()
+        scheme = GovernmentScheme.objects.first()
+        article = NewsArticle.objects.first()
+        approval_type = ApprovalType.objects.first()
+        # A value of None means there is no row to render the page for
+        return {
+            'type_id': approval_type and approval_type.id,
+            'application_id': application and application.id,
+            'application_number': application and application.application_number,
+            'document_id': document and document.id,
+            'compliance_id': compliance and compliance.id,
+            'scheme_id': scheme and scheme.id,
+            'news_id': article and article.id,
+        }
+
+    def pages(self, user):
+        # Every named business_portal URL, so new pages are benchmarked
+        # without being listed here; ones that render no template (JSON,
+        # files, POST-only, redirects) are left out when they are requested.
+        values = self.url_kwargs(user)
+        for pattern in urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            kwargs = {name: values.get(name) for name in pattern.pattern.converters}
+            yield pattern.name, None if None in kwargs.values() else kwargs
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+        if options['staff_user']:
+            try:
+                staff = User.objects.get(username=options['staff_user'], is_staff=True)
+            except User.DoesNotExist:
+                raise CommandError(f"Staff user '{options['staff_user']}' does not exist")
+        else:
+            staff = User.objects.filter(is_staff=True, is_active=True).first()
+
+        setup_test_environment()
+        try:
+            self.benchmark(user, staff, options['iterations'])
+        finally:
+            teardown_test_environment()
+
+    def benchmark(self, user, staff, iterations):
+        clients = []
+        for account in (user, staff):
+            if account is not None:
+                client = Client()
+                client.force_login(account)
+                clients.append(client)
+        # Last, for pages such as login that redirect signed-in users.
+        clients.append(Client())
+
+        known = set(template_names())
+        rendered = set()
+        self.stdout.write(f"{'page':<26}{'template':<28}{'cold ms':>10}{'warm p50':>10}{'warm p90':>10}")
+        for url_name, kwargs in self.pages(user):
+            if kwargs is None:
+                self.stdout.write(f'{url_name:<26}{"skipped (no data)":>30}')
+                continue
+            url = reverse(url_name, kwargs=kwargs)
+            # GETs such as mark_compliance_complete change data; undo them.
+            with transaction.atomic():
+                result = self.measure(clients, url, iterations, known)
+                transaction.set_rollback(True)
+            if result is None:
+                continue
+            templates, cold, p50, p90 = result
+            rendered.update(templates)
+            template = templates[0].split('/')[-1]
+            self.stdout.write(f'{url_name:<26}{template:<28}{cold:>10.2f}{p50:>10.2f}{p90:>10.2f}')
+
+        missed = sorted(known - rendered)
+        if missed:
+            self.stdout.write(f"Not rendered by any page: {', '.join(missed)}")
+
+    def measure(self, clients, url, iterations, known):
+        for client in clients:
+            cache.clear()
+            start = time.perf_counter()
+            response = client.get(url)
+            cold = (time.perf_counter() - start) * 1000
+            # Form widget and Django's own templates do not count, nor do
+            # JSON responses such as /ready, whose warm-up renders pages.
+            templates = [t.name for t in response.templates if t.name in known]
+            if response.status_code == 200 and response['Content-Type'].startswith('text/html') and templates:
+                break
+        else:
+            return None
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p50 = statistics.median(timings)
+        p90 = timings[int(len(timings) * 0.9) - 1] if len(timings) > 1 else timings[0]
+        return templates, cold, p50, p90
@@ -0,0 +1,224 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+
+PNG_EXTENSIONS = ('.png',)
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+DOCX_EXTENSIONS = ('.docx',)
+COMPRESS_BATCH = 1000
+# Files already recompressed, by name, with the (size, mtime_ns) they had
+# afterwards; kept in MEDIA_ROOT so it travels with the files.
+MANIFEST_NAME = '.clean_media.json'
+
+
+def walk_files(root):
+    # Iterative os.scandir walk; yields DirEntry objects without building a list.
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def referenced_paths():
+    # Every FileField/ImageField value of every installed model.
+    referenced = set()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                names = (
+                    model._default_manager.exclude(**{field.name: ''})
+                    .exclude(**{f'{field.name}__isnull': True})
+                    .values_list(field.name, flat=True)
+                    .iterator(chunk_size=5000)
+                )
+                referenced.update(os.path.normpath(name) for name in names)
+    return referenced
+
+
+def signed_paths():
+    # Recompressing a signed document would change its SHA-256 and
+    # invalidate the signature, so these files are never rewritten.
+    from business_portal.models import ArchivedSignature, DigitalSignature
+    signed = set()
+    for names in (
+        DigitalSignature.objects.exclude(document_sha256='').values_list('document__document', flat=True),
+        ArchivedSignature.objects.exclude(document_sha256='').values_list('document__document', flat=True),
+    ):
+        signed.update(os.path.normpath(name) for name in names.iterator(chunk_size=5000))
+    return signed
+
+
+def replace_if_smaller(path, data):
+    # The mtime is left to change with the bytes: serve_protected_file
+    # answers If-Modified-Since from it, and keeping the old one would
+    # give clients holding the previous bytes a 304.
+    if len(data) >= os.path.getsize(path):
+        return 0
+    saved = os.path.getsize(path) - len(data)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(data)
+    shutil.copymode(path, tmp)
+    os.replace(tmp, path)
+    return saved
+
+
+def recompress(path, jpeg_quality=None):
+    """
+    Runs in a worker process. Returns (path, bytes saved, error). PNG and
+    DOCX are rewritten losslessly; JPEGs only when jpeg_quality is given.
+    EXIF (orientation included) and ICC colour profiles are kept.
+    """
+    try:
+        lower = path.lower()
+        if lower.endswith(PNG_EXTENSIONS + JPEG_EXTENSIONS):
+            from PIL import Image
+            buffer = io.BytesIO()
+            with Image.open(path) as image:
+                metadata = {key: image.info[key] for key in ('exif', 'icc_profile') if image.info.get(key)}
+                if lower.endswith(PNG_EXTENSIONS):
+                    image.save(buffer, format='PNG', optimize=True, **metadata)
+                elif jpeg_quality:
+                    image.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True, progressive=True, **metadata)
+                else:
+                    return path, 0, None
+            return path, replace_if_smaller(path, buffer.getvalue()), None
+        if lower.endswith(DOCX_EXTENSIONS):
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(path) as source, \
+                    zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as target:
+                for info in source.infolist():
+                    target.writestr(info, source.read(info.filename), compress_type=zipfile.ZIP_DEFLATED)
+            return path, replace_if_smaller(path, buffer.getvalue()), None
+    except Exception as exc:
+        return path, 0, str(exc)
+    return path, 0, None
+
+
+def load_manifest(path):
+    try:
+        with open(path) as fh:
+            return {name: tuple(value) for name, value in json.load(fh).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = 'Removes media files no model references and recompresses cold images and DOCX files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be done')
+        parser.add_argument('--min-age-hours', type=int, default=24,
+                            help='Never delete files younger than this, so in-flight uploads are safe')
+        parser.add_argument('--compress', action='store_true',
+                            help='Losslessly recompress cold PNG and DOCX files')
+        parser.add_argument('--lossy-jpeg', type=int, metavar='QUALITY', default=None,
+                            help='With --compress, also re-encode cold JPEGs at this quality (lossy)')
+        parser.add_argument('--cold-days', type=int, default=180)
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        dry_run = options['dry_run']
+        compress = options['compress'] and not dry_run
+        now = time.time()
+        orphan_cutoff = now - options['min_age_hours'] * 3600
+        cold_cutoff = now - options['cold_days'] * 86400
+
+        referenced = referenced_paths()
+        signed = signed_paths() if options['compress'] else set()
+        self.stdout.write(f'{len(referenced)} files referenced by the database')
+        extensions = PNG_EXTENSIONS + DOCX_EXTENSIONS + (JPEG_EXTENSIONS if options['lossy_jpeg'] else ())
+        manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.manifest = load_manifest(manifest_path)
+        self.seen = set()
+        self.jpeg_quality = options['lossy_jpeg']
+
+        self.scanned = self.orphans = self.orphan_bytes = 0
+        self.cold = self.compressed = self.failed = self.saved = 0
+        with ExitStack() as stack:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=options['workers'])) if compress else None
+            batch = []
+            for entry in walk_files(root):
+                name = os.path.normpath(os.path.relpath(entry.path, root))
+                if name == MANIFEST_NAME:
+                    continue
+                self.scanned += 1
+                stat = entry.stat(follow_symlinks=False)
+                if name not in referenced:
+                    if stat.st_mtime <= orphan_cutoff:
+                        self.remove(entry.path, name, stat.st_size, dry_run)
+                    continue
+                self.seen.add(name)
+                if options['compress'] and max(stat.st_atime, stat.st_mtime) < cold_cutoff \
+                        and name.lower().endswith(extensions) and name not in signed \
+                        and self.manifest.get(name) != (stat.st_size, stat.st_mtime_ns):
+                    self.cold += 1
+                    if compress:
+                        batch.append(entry.path)
+                        if len(batch) >= COMPRESS_BATCH:
+                            self.compress(executor, batch)
+                            batch = []
+            if batch:
+                self.compress(executor, batch)
+        if compress:
+            save_manifest(manifest_path, {name: value for name, value in self.manifest.items() if name in self.seen})
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(f'Scanned {self.scanned} files. {verb} {self.orphans} orphans '
+                          f'({self.orphan_bytes / 1024 / 1024:.1f} MB)')
+        if options['compress']:
+            if dry_run:
+                self.stdout.write(f'Would recompress {self.cold} cold files')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Recompressed {self.compressed} cold files ({self.failed} failed), '
+                    f'saved {self.saved / 1024 / 1024:.1f} MB'
+                ))
+
+    def remove(self, path, name, size, dry_run):
+        self.orphans += 1
+        self.orphan_bytes += size
+        if dry_run:
+            self.stdout.write(f'  orphan: {name} ({size} bytes)')
+        else:
+            os.remove(path)
+
+    def compress(self, executor, paths):
+        results = executor.map(recompress, paths, [self.jpeg_quality] * len(paths), chunksize=32)
+        for path, bytes_saved, error in results:
+            if error:
+                self.failed += 1
+                self.stderr.write(f'  {path}: {error}')
+                continue
+            self.compressed += 1
+            self.saved += bytes_saved
+            # Skipped from now on unless the file changes.
+            stat = os.stat(path)
+            self.manifest[os.path.normpath(os.path.relpath(path, settings.MEDIA_ROOT))] = (stat.st_size, stat.st_mtime_ns)
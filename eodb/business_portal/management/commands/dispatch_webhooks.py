@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from business_portal.webhooks import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending webhook events to subscribers, batched per subscriber'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Deliveries to claim per round')
+        parser.add_argument('--loop', type=float, default=None, metavar='SECONDS',
+                            help='Keep running, polling this often when nothing is due')
+
+    def handle(self, *args, **options):
+        total_delivered = total_failed = 0
+        while True:
+            delivered, failed = dispatch_pending(limit=options['limit'])
+            total_delivered += delivered
+            total_failed += failed
+            if delivered or failed:
+                if options['loop'] is not None:
+                    self.stdout.write(f'Delivered {delivered}, failed {failed}')
+                continue
+            if options['loop'] is None:
+                break
+            time.sleep(options['loop'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Delivered {total_delivered} events, {total_failed} failed attempts will be retried or given up'
+        ))
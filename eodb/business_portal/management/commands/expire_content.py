@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from business_portal.lifecycle import expire_content, expired_schemes, stale_news
+
+
+class Command(BaseCommand):
+    help = 'Deactivates schemes past their end date and news older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Deactivate news published more than this many days ago (default NEWS_RETENTION_DAYS)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deactivated')
+
+    def handle(self, *args, **options):
+        retention_days = options['retention_days']
+        if retention_days is None:
+            retention_days = getattr(settings, 'NEWS_RETENTION_DAYS', 365)
+        if options['dry_run']:
+            today = timezone.localdate()
+            schemes = expired_schemes(today).count()
+            news = stale_news(today, retention_days).count()
+            self.stdout.write(f'Would deactivate {schemes} schemes and {news} news articles')
+            return
+        schemes, news = expire_content(retention_days=retention_days)
+        self.stdout.write(self.style.SUCCESS(f'Deactivated {schemes} schemes and {news} news articles'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from business_portal.onboarding import OnboardingError, onboard, parse_members
+
+
+class Command(BaseCommand):
+    help = 'Creates users and business profiles in bulk from a CSV or JSON file of members'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or a JSON list of member objects')
+        parser.add_argument('--base-url', required=True,
+                            help='Portal address used in set-password links, e.g. https://eodb.delhi.gov.in')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes for password hashing (default ONBOARDING_HASH_WORKERS)')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as fh:
+                rows = parse_members(fh.read(), options['path'])
+            summary = onboard(rows, options['base_url'], dry_run=options['dry_run'], workers=options['workers'])
+        except (OSError, UnicodeDecodeError, OnboardingError) as exc:
+            raise CommandError(str(exc))
+
+        for number, problems in summary['errors'].items():
+            self.stderr.write(f"Row {number}: {'; '.join(problems)}")
+        if options['dry_run']:
+            self.stdout.write(f"{summary['valid']} of {summary['rows']} rows are valid")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['created']} of {summary['rows']} members, "
+            f"sent {summary['links_sent']} set-password links"))
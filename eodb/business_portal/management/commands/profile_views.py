@@ -0,0 +1,257 @@
+import json
+import re
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+from business_portal.models import (
+    ApprovalApplication, ApplicationDocument, ApprovalType,
+    GovernmentScheme, NewsArticle
+)
+
+# Pages replayed by default. Views that change data on GET (logout,
+# mark_compliance_complete) are left out; every request is rolled back
+# regardless.
+DEFAULT_VIEWS = [
+    'home', 'dashboard', 'business_profile', 'approval_types', 'create_application',
+    'application_details', 'add_signature', 'government_schemes', 'scheme_details',
+    'compliances', 'news', 'news_detail', 'review_queue',
+]
+
+# The table name is anchored so \S+ cannot backtrack into the lookahead.
+SCAN_RE = re.compile(r'^SCAN (\S+)(?!\S)(?! USING (?:COVERING )?INDEX)')
+# Savepoints carry unique names, so every one would rank as a statement.
+TRANSACTION_RE = re.compile(r'^\s*(?:SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Replays views, captures their SQL and ranks statements by total time with EXPLAIN QUERY PLAN'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', action='append', dest='views', metavar='NAME[:ARG,...]',
+                            help='URL name to replay, optionally with its arguments; repeatable (default: main pages)')
+        parser.add_argument('--user', action='append', dest='users', metavar='USERNAME',
+                            help='Replay as this user; repeatable. "anonymous" replays logged out')
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per view and user')
+        parser.add_argument('--top', type=int, default=20, help='Statements to show in the text report')
+        parser.add_argument('--format', choices=['text', 'json'], default='text')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        users = []
+        for username in options['users'] or ['anonymous']:
+            if username == 'anonymous':
+                users.append(None)
+                continue
+            try:
+                users.append(User.objects.get(username=username))
+            except User.DoesNotExist:
+                raise CommandError(f"User '{username}' does not exist")
+
+        setup_test_environment()
+        try:
+            requests, statements = self.replay(options['views'] or DEFAULT_VIEWS, users, options['repeat'])
+        finally:
+            teardown_test_environment()
+        self.explain(statements)
+        report = self.build_report(requests, statements)
+
+        if options['format'] == 'json':
+            output = json.dumps(report, indent=2, default=str)
+        else:
+            output = self.render_text(report, options['top'])
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def default_args(self, url_name, user):
+        """Pick a row to render parameterised pages for, as benchmark_templates does."""
+        params = get_resolver().reverse_dict.getlist(url_name)
+        if not params or not params[0][0][0][1]:
+            return []
+        owned = {'business__user': user} if user else {}
+        sample = {
+            'application_id': lambda: ApprovalApplication.objects.filter(**owned),
+            'document_id': lambda: ApplicationDocument.objects.filter(
+                **{f'application__{k}': v for k, v in owned.items()}),
+            'type_id': lambda: ApprovalType.objects.filter(is_active=True),
+            'scheme_id': lambda: GovernmentScheme.objects.filter(is_active=True),
+            'news_id': lambda: NewsArticle.objects.filter(is_active=True),
+        }
+        args = []
+        for name in params[0][0][0][1]:
+            if name not in sample:
+                return None
+            pk = sample[name]().order_by('pk').values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            args.append(pk)
+        return args
+
+    def replay(self, views, users, repeat):
+        statements = {}
+        requests = []
+        current = {}
+
+        def capture(execute, sql, params, many, context):
+            if TRANSACTION_RE.match(sql):
+                return execute(sql, params, many, context)
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                key = current['key']
+                stats = statements.setdefault(sql, {
+                    'sql': sql, 'params': params, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'views': set(), 'max_per_request': 0, 'duplicates': 0,
+                })
+                stats['count'] += 1
+                stats['total_ms'] += elapsed
+                stats['max_ms'] = max(stats['max_ms'], elapsed)
+                stats['views'].add(key)
+                seen = current['seen']
+                seen[sql] = seen.get(sql, 0) + 1
+                stats['max_per_request'] = max(stats['max_per_request'], seen[sql])
+                exact = (sql, repr(params))
+                if exact in current['exact']:
+                    stats['duplicates'] += 1
+                current['exact'].add(exact)
+                current['queries'] += 1
+                current['db_ms'] += elapsed
+
+        for spec in views:
+            url_name, _, arg_spec = spec.partition(':')
+            for user in users:
+                label = f"{url_name} as {user.username if user else 'anonymous'}"
+                args = arg_spec.split(',') if arg_spec else self.default_args(url_name, user)
+                if args is None:
+                    requests.append({'view': label, 'skipped': 'no data to render it for'})
+                    continue
+                try:
+                    url = reverse(url_name, args=args)
+                except NoReverseMatch:
+                    raise CommandError(f"Cannot reverse '{spec}'")
+                client = Client()
+                if user:
+                    client.force_login(user)
+
+                timings, counts, db_times, status = [], [], [], None
+                # The first request runs cold, later ones see the fragment cache.
+                cache.clear()
+                for _ in range(repeat):
+                    current.update(key=label, seen={}, exact=set(), queries=0, db_ms=0.0)
+                    start = time.perf_counter()
+                    try:
+                        # Anything the view writes is rolled back.
+                        with transaction.atomic(), connection.execute_wrapper(capture):
+                            status = client.get(url).status_code
+                            raise Rollback
+                    except Rollback:
+                        pass
+                    timings.append((time.perf_counter() - start) * 1000)
+                    counts.append(current['queries'])
+                    db_times.append(current['db_ms'])
+                if user:
+                    # Drops the session force_login created.
+                    client.logout()
+                requests.append({
+                    'view': label,
+                    'url': url,
+                    'status': status,
+                    'queries': max(counts),
+                    'avg_ms': sum(timings) / len(timings),
+                    'avg_db_ms': sum(db_times) / len(db_times),
+                })
+        return requests, statements
+
+    def explain(self, statements):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        for stats in statements.values():
+            stats['plan'] = []
+            stats['flags'] = []
+            if not stats['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(prefix + stats['sql'], stats['params'])
+                    stats['plan'] = [str(row[-1]) for row in cursor.fetchall()]
+            except DatabaseError as exc:
+                stats['plan'] = [f'EXPLAIN failed: {exc}']
+                continue
+            stats['flags'] = self.flags(stats)
+
+    def flags(self, stats):
+        flags = []
+        has_where = ' WHERE ' in stats['sql'].upper()
+        for line in stats['plan']:
+            detail = line.strip()
+            scan = SCAN_RE.match(detail)
+            if scan or 'Seq Scan' in detail:
+                table = scan.group(1) if scan else detail
+                flags.append(f'full scan of {table}' + (' with a WHERE clause: missing index?' if has_where else ''))
+            if 'USE TEMP B-TREE' in detail:
+                flags.append(f'sort without an index ({detail.split("FOR ")[-1]})')
+        if stats['max_per_request'] > 1:
+            flags.append(f"runs up to {stats['max_per_request']}x per request: N+1?")
+        if stats['duplicates']:
+            flags.append(f"{stats['duplicates']} identical repeats within a request")
+        return flags
+
+    def build_report(self, requests, statements):
+        ranked = sorted(statements.values(), key=lambda s: s['total_ms'], reverse=True)
+        return {
+            'database': connection.vendor,
+            'requests': requests,
+            'statements': [
+                {
+                    'sql': s['sql'],
+                    'count': s['count'],
+                    'total_ms': round(s['total_ms'], 3),
+                    'avg_ms': round(s['total_ms'] / s['count'], 3),
+                    'max_ms': round(s['max_ms'], 3),
+                    'views': sorted(s['views']),
+                    'plan': s['plan'],
+                    'flags': s['flags'],
+                }
+                for s in ranked
+            ],
+        }
+
+    def render_text(self, report, top):
+        lines = [f"{'view':<44}{'status':>7}{'queries':>9}{'avg ms':>10}{'db ms':>10}"]
+        for r in report['requests']:
+            if 'skipped' in r:
+                lines.append(f"{r['view']:<44}  skipped ({r['skipped']})")
+                continue
+            lines.append(f"{r['view']:<44}{r['status']:>7}{r['queries']:>9}{r['avg_ms']:>10.2f}{r['avg_db_ms']:>10.2f}")
+
+        statements = report['statements']
+        lines += ['', f'Slowest statements by total time ({min(top, len(statements))} of {len(statements)})']
+        for i, s in enumerate(statements[:top], start=1):
+            lines.append('')
+            lines.append(f"{i}. {s['total_ms']:.2f} ms total, {s['count']} runs, {s['avg_ms']:.3f} ms avg, "
+                         f"{s['max_ms']:.3f} ms max")
+            lines.append(f"   {s['sql'][:300]}{'...' if len(s['sql']) > 300 else ''}")
+            for line in s['plan']:
+                lines.append(f'   plan: {line}')
+            for flag in s['flags']:
+                lines.append(f'   ! {flag}')
+            lines.append(f"   views: {', '.join(s['views'])}")
+
+        flagged = sum(1 for s in statements if s['flags'])
+        lines += ['', f'{flagged} of {len(statements)} distinct statements flagged']
+        return '\n'.join(lines)
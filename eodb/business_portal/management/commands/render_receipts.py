@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from business_portal.models import ApplicationReceipt, ApprovalApplication
+from business_portal.receipts import generate_receipt, is_fresh
+
+
+class Command(BaseCommand):
+    help = 'Renders missing or stale PDF receipts for submitted applications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render even current receipts')
+
+    def handle(self, *args, **options):
+        rendered = 0
+        applications = ApprovalApplication.objects.exclude(status='draft').select_related('receipt')
+        for application in applications.iterator(chunk_size=500):
+            try:
+                receipt = application.receipt
+            except ApplicationReceipt.DoesNotExist:
+                receipt = None
+            if options['force'] or not is_fresh(receipt, application):
+                generate_receipt(application.id, force=options['force'])
+                rendered += 1
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} receipts'))
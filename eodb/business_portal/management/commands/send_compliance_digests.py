@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from business_portal.reminders import REMINDER_DAYS, pending_reminders, send_compliance_digests
+
+
+class Command(BaseCommand):
+    help = 'Emails every user one digest of their overdue and due-soon compliances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=REMINDER_DAYS, help='Include compliances due within this many days')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        compliances = pending_reminders(days=options['days']).iterator(chunk_size=2000)
+        sent, covered = send_compliance_digests(compliances, days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digest emails covering {covered} compliances'))
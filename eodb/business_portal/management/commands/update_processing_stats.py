@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from business_portal.analytics import rebuild_processing_stats, update_processing_stats
+
+
+class Command(BaseCommand):
+    help = 'Updates per approval type processing time statistics from new decisions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute everything from ApprovalApplication')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild_processing_stats()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} approval types'))
+        else:
+            processed = update_processing_stats()
+            self.stdout.write(self.style.SUCCESS(f'Folded {processed} new decisions into processing statistics'))
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from business_portal import signing
+from business_portal.models import DigitalSignature
+
+_key = None
+
+
+def init_worker(key):
+    global _key
+    _key = key
+
+
+def verify_batch(rows):
+    """Runs in a worker process. rows are (id, path, document_id, user_id, sha256, signature, is_valid)."""
+    results = []
+    for pk, path, document_id, user_id, sha256, signature, is_valid in rows:
+        valid = signing.verify(path, document_id, user_id, sha256, signature, key=_key)
+        results.append((pk, valid, is_valid))
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Re-hashes signed documents and updates DigitalSignature.is_valid'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers'] or os.cpu_count() or 1
+        self.checked = self.flipped = self.unreadable = 0
+
+        rows = (
+            DigitalSignature.objects.exclude(document_sha256='')
+            .order_by('id')
+            .values_list('id', 'document__document', 'document_id', 'user_id',
+                         'document_sha256', 'signature', 'is_valid')
+            .iterator(chunk_size=batch_size)
+        )
+        skipped = DigitalSignature.objects.filter(document_sha256='').count()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(signing.signing_key(),)) as executor:
+            pending = set()
+            batch = []
+            for pk, name, document_id, user_id, sha256, signature, is_valid in rows:
+                path = os.path.join(settings.MEDIA_ROOT, name)
+                batch.append((pk, path, document_id, user_id, sha256, signature, is_valid))
+                if len(batch) >= batch_size:
+                    pending.add(executor.submit(verify_batch, batch))
+                    batch = []
+                    # Keep a bounded number of batches in flight.
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self.save_results(future.result())
+            if batch:
+                pending.add(executor.submit(verify_batch, batch))
+            for future in pending:
+                self.save_results(future.result())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Verified {self.checked} signatures, {self.flipped} changed validity, '
+            f'{self.unreadable} could not be read, {skipped} legacy signatures without a hash skipped'
+        ))
+
+    def save_results(self, results):
+        now = timezone.now()
+        # Unreadable documents keep their previous state and verified_at.
+        for pk, valid, was_valid in results:
+            if valid is None:
+                self.unreadable += 1
+                self.stderr.write(f'  signature {pk}: document could not be read')
+        results = [result for result in results if result[1] is not None]
+        changed = [
+            DigitalSignature(id=pk, is_valid=valid, verified_at=now)
+            for pk, valid, was_valid in results if valid != was_valid
+        ]
+        if changed:
+            DigitalSignature.objects.bulk_update(changed, ['is_valid', 'verified_at'], batch_size=500)
+        unchanged = [pk for pk, valid, was_valid in results if valid == was_valid]
+        if unchanged:
+            DigitalSignature.objects.filter(id__in=unchanged).update(verified_at=now)
+        self.checked += len(results)
+        self.flipped += len(changed)
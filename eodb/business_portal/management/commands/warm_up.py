@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from business_portal.warmup import state, warm_up
+
+MEASURE_SCRIPT = '''
+import sys, time
+import django
+django.setup()
+from django.test.utils import setup_test_environment
+setup_test_environment()
+if sys.argv[2] == 'warm':
+    from business_portal.warmup import warm_up
+    warm_up()
+from django.test import Client
+start = time.perf_counter()
+Client().get(sys.argv[1])
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+class Command(BaseCommand):
+    help = 'Warms up this process (templates, URLs, DB, caches) or measures cold vs warm first-request latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--measure', action='store_true',
+                            help='Compare the first request of a cold and a warmed-up fresh process')
+        parser.add_argument('--url', default='/')
+        parser.add_argument('--runs', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if not options['measure']:
+            timings = warm_up()
+            for step, ms in timings.items():
+                self.stdout.write(f'{step:<12}{ms:>10.2f} ms')
+            if state['failed']:
+                raise CommandError(f"Warm-up steps failed: {', '.join(state['failed'])}")
+            self.stdout.write(self.style.SUCCESS(f'Warm-up finished in {sum(timings.values()):.2f} ms'))
+            return
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'eodb.settings'))
+        cwd = str(settings.BASE_DIR)
+        for mode in ('cold', 'warm'):
+            samples = []
+            for _ in range(options['runs']):
+                output = subprocess.run(
+                    [sys.executable, '-c', MEASURE_SCRIPT, options['url'], mode],
+                    capture_output=True, text=True, check=True, env=env, cwd=cwd,
+                ).stdout
+                samples.append(float(output.strip().splitlines()[-1]))
+            best = min(samples)
+            self.stdout.write(f'{mode:<6} first request to {options["url"]}: {best:.2f} ms (best of {len(samples)})')
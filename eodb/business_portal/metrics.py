@@ -0,0 +1,306 @@
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (10_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000, 50_000_000)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry[name] = self
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            # [per-bucket counts..., sum, count]; cumulative counts are
+            # produced at exposition time.
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+registry = {}
+
+REQUEST_LATENCY = Histogram('eodb_request_duration_seconds', 'Request latency by URL name and status code',
+                            ['url_name', 'method', 'status'])
+DB_QUERIES = Counter('eodb_db_queries_total', 'Database queries executed', ['url_name'])
+DB_TIME = Counter('eodb_db_query_seconds_total', 'Time spent in database queries', ['url_name'])
+EMAIL_SEND = Histogram('eodb_email_send_duration_seconds', 'Time to hand emails to the mail backend', ['kind'])
+CACHE_REQUESTS = Counter('eodb_cache_requests_total', 'Cache lookups by result', ['cache', 'result'])
+UPLOAD_SIZE = Histogram('eodb_upload_size_bytes', 'Size of uploaded files', ['kind'], buckets=SIZE_BUCKETS)
+
+
+def snapshot():
+    data = {}
+    for metric in registry.values():
+        with metric.lock:
+            data[metric.name] = [[list(k), v if not isinstance(v, list) else list(v)] for k, v in metric.values.items()]
+    return data
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+_last_flush = [0.0]
+
+
+def flush(force=False):
+    """
+    Write this process's metrics to METRICS_DIR so /metrics on any worker
+    can aggregate all of them. Rate limited to METRICS_FLUSH_INTERVAL.
+    """
+    directory = metrics_dir()
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush[0] < getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+        return
+    _last_flush[0] = now
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(snapshot(), fh)
+    os.replace(tmp, path)
+
+
+def authorized(header):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token or not header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(header[len('Bearer '):].encode(), token.encode())
+
+
+AGGREGATE_NAME = 'aggregate.json'
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_samples(merged, data):
+    for name, samples in data.items():
+        target = merged.setdefault(name, {})
+        for key, value in samples:
+            key = tuple(key)
+            if isinstance(value, list):
+                current = target.get(key) or [0] * len(value)
+                target[key] = [a + b for a, b in zip(current, value)]
+            else:
+                target[key] = target.get(key, 0) + value
+    return merged
+
+
+def as_samples(merged):
+    return {name: [[list(k), v] for k, v in samples.items()] for name, samples in merged.items()}
+
+
+def collect():
+    """Merge the snapshots of every process (or just this one)."""
+    directory = metrics_dir()
+    if not directory:
+        return snapshot()
+    flush(force=True)
+    aggregate = read_snapshot(os.path.join(directory, AGGREGATE_NAME)) or {}
+    merged = merge_samples({}, aggregate.get('samples', {}))
+    # Already part of the aggregate; its file may not be removed yet.
+    retired = f"metrics_{aggregate.get('retired')}.json"
+    for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+        if os.path.basename(path) == retired:
+            continue
+        data = read_snapshot(path)
+        if data is not None:
+            merge_samples(merged, data)
+    return as_samples(merged)
+
+
+def retire_worker(directory, pid):
+    """
+    Fold an exited worker's snapshot into the aggregate file, as
+    prometheus_client's multiprocess mode does. Counters and histograms
+    are totals, and dropping them would make them go down, which rate()
+    reads as a reset. Gauges only describe the dead process and are
+    dropped. Runs in the gunicorn master, without Django configured.
+    """
+    path = os.path.join(directory, f'metrics_{pid}.json')
+    data = read_snapshot(path)
+    if data is None:
+        return
+    aggregate_path = os.path.join(directory, AGGREGATE_NAME)
+    merged = merge_samples({}, (read_snapshot(aggregate_path) or {}).get('samples', {}))
+    merge_samples(merged, {
+        name: samples for name, samples in data.items()
+        if name not in registry or registry[name].kind != 'gauge'
+    })
+    tmp = f'{aggregate_path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump({'retired': pid, 'samples': as_samples(merged)}, fh)
+    os.replace(tmp, aggregate_path)
+    os.remove(path)
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{n}="{escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render_text(data=None):
+    """Prometheus text exposition format 0.0.4."""
+    data = collect() if data is None else data
+    lines = []
+    for name, metric in registry.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(data.get(name, []), key=lambda sample: sample[0]):
+            if metric.kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f'{name}_bucket{format_labels(metric.labelnames, key, le)} {cumulative}')
+                le = 'le="+Inf"'
+                lines.append(f'{name}_bucket{format_labels(metric.labelnames, key, le)} {value[-1]}')
+                lines.append(f'{name}_sum{format_labels(metric.labelnames, key)} {value[-2]}')
+                lines.append(f'{name}_count{format_labels(metric.labelnames, key)} {value[-1]}')
+            else:
+                lines.append(f'{name}{format_labels(metric.labelnames, key)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Records request latency and per-request database query count/time."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db = {'count': 0, 'time': 0.0}
+
+        def timed_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db['count'] += 1
+                db['time'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timed_query))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name if match else None) or 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, url_name=url_name,
+                                method=request.method, status=response.status_code)
+        if db['count']:
+            DB_QUERIES.inc(db['count'], url_name=url_name)
+            DB_TIME.inc(db['time'], url_name=url_name)
+        flush()
+        return response
+
+
+class CacheMetricsMixin:
+    """Counts hits and misses; mix into any Django cache backend."""
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = super().get(key, sentinel, version=version)
+        if value is sentinel:
+            CACHE_REQUESTS.inc(cache=self.metrics_name, result='miss')
+            return default
+        CACHE_REQUESTS.inc(cache=self.metrics_name, result='hit')
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        CACHE_REQUESTS.inc(len(found), cache=self.metrics_name, result='hit')
+        CACHE_REQUESTS.inc(len(keys) - len(found), cache=self.metrics_name, result='miss')
+        return found
+
+    @property
+    def metrics_name(self):
+        return getattr(self, '_metrics_name', type(self).__name__)
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._metrics_name = name
+
+
+class InstrumentedDatabaseCache(CacheMetricsMixin, DatabaseCache):
+    def __init__(self, table, params):
+        super().__init__(table, params)
+        self._metrics_name = table
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._metrics_name = 'redis'
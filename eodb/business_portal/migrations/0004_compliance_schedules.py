@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0003_card_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_type', models.CharField(blank=True, choices=[('retail', 'Retail'), ('manufacturing', 'Manufacturing'), ('service', 'Service'), ('it', 'Information Technology'), ('hospitality', 'Hospitality'), ('other', 'Other')], max_length=50, null=True)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('frequency', models.CharField(choices=[('monthly', 'Monthly'), ('quarterly', 'Quarterly'), ('annual', 'Annual')], max_length=20)),
+                ('day_of_month', models.PositiveSmallIntegerField(default=20)),
+                ('start_month', models.PositiveSmallIntegerField(default=1, help_text='First month of the cycle (1-12) for quarterly and annual schedules')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('business', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='business_portal.businessprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='compliance',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='business_portal.complianceschedule'),
+        ),
+        migrations.AddIndex(
+            model_name='compliance',
+            index=models.Index(fields=['business', '-due_date'], name='compliance_business_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='compliance',
+            constraint=models.UniqueConstraint(fields=('business', 'schedule', 'due_date'), name='unique_scheduled_compliance'),
+        ),
+        migrations.AddConstraint(
+            model_name='complianceschedule',
+            constraint=models.CheckConstraint(condition=models.Q(('business__isnull', False), ('business_type__isnull', False), _connector='OR'), name='compliance_schedule_has_target'),
+        ),
+    ]
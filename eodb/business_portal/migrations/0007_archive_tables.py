@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0006_processing_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('application_number', models.CharField(max_length=50, unique=True)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('submitted', 'Submitted'), ('under_review', 'Under Review'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('additional_info_required', 'Additional Info Required')], max_length=50)),
+                ('submission_date', models.DateTimeField(blank=True, null=True)),
+                ('approval_date', models.DateTimeField(blank=True, null=True)),
+                ('rejection_reason', models.TextField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('status_history', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('approval_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='business_portal.approvaltype')),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='business_portal.businessprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedDocument',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('document_type', models.CharField(choices=[('pan', 'PAN Card'), ('address', 'Address Proof'), ('registration', 'Business Registration'), ('id', 'ID Proof'), ('other', 'Other')], max_length=50)),
+                ('document', models.FileField(upload_to='application_documents/')),
+                ('is_verified', models.BooleanField(default=False)),
+                ('verification_notes', models.TextField(blank=True, null=True)),
+                ('uploaded_at', models.DateTimeField()),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='business_portal.archivedapplication')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSignature',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('signature_image', models.ImageField(upload_to='digital_signatures/')),
+                ('signed_at', models.DateTimeField()),
+                ('is_valid', models.BooleanField(default=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signatures', to='business_portal.archiveddocument')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
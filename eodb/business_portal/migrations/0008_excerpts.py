@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:04
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+EXCERPTS = {
+    'GovernmentScheme': {
+        'excerpt': ('description', 150),
+        'eligibility_excerpt': ('eligibility', 100),
+        'benefits_excerpt': ('benefits', 100),
+    },
+    'ApprovalType': {'excerpt': ('description', 200)},
+    'NewsArticle': {'excerpt': ('content', 150)},
+}
+
+
+def backfill_excerpts(apps, schema_editor):
+    for model_name, excerpts in EXCERPTS.items():
+        model = apps.get_model('business_portal', model_name)
+        sources = [source for source, _ in excerpts.values()]
+        batch = []
+        for obj in model.objects.only('pk', *sources).iterator(chunk_size=1000):
+            for field, (source, length) in excerpts.items():
+                setattr(obj, field, Truncator(getattr(obj, source) or '').chars(length))
+            batch.append(obj)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, list(excerpts), batch_size=1000)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, list(excerpts), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0007_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvaltype',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='governmentscheme',
+            name='benefits_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='governmentscheme',
+            name='eligibility_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='governmentscheme',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
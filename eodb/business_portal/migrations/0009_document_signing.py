@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0008_excerpts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsignature',
+            name='algorithm',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='archivedsignature',
+            name='document_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='archivedsignature',
+            name='signature',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='archivedsignature',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='digitalsignature',
+            name='algorithm',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='digitalsignature',
+            name='document_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='digitalsignature',
+            name='signature',
+            field=models.CharField(blank=True, editable=False, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='digitalsignature',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
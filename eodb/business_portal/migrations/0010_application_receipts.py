@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0009_document_signing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationReceipt',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='receipt', serialize=False, to='business_portal.approvalapplication')),
+                ('file', models.FileField(upload_to='receipts/')),
+                ('source_updated_at', models.DateTimeField()),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0010_application_receipts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalapplication',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='review_claims', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='approvalapplication',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='approvalapplication',
+            name='lease_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='approvalapplication',
+            index=models.Index(fields=['status', 'submission_date'], name='application_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvalapplication',
+            index=models.Index(fields=['lease_token'], name='application_lease_token_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0012_webhooks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvaltype',
+            name='business_type',
+            field=models.CharField(blank=True, choices=[('retail', 'Retail'), ('manufacturing', 'Manufacturing'), ('service', 'Service'), ('it', 'Information Technology'), ('hospitality', 'Hospitality'), ('other', 'Other')], max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='governmentscheme',
+            name='business_type',
+            field=models.CharField(blank=True, choices=[('retail', 'Retail'), ('manufacturing', 'Manufacturing'), ('service', 'Service'), ('it', 'Information Technology'), ('hospitality', 'Hospitality'), ('other', 'Other')], max_length=50, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='approvaltype',
+            index=models.Index(fields=['is_active', 'department', 'fees'], name='approval_type_facet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='governmentscheme',
+            index=models.Index(fields=['is_active', 'start_date', 'end_date'], name='scheme_active_window_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0013_catalog_facets'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='approvaltype',
+            name='approval_type_facet_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='governmentscheme',
+            name='scheme_active_window_idx',
+        ),
+        migrations.AddIndex(
+            model_name='approvaltype',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['department', 'fees'], name='approval_type_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='governmentscheme',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='scheme_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='governmentscheme',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['end_date', 'start_date'], name='scheme_live_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsarticle',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-publish_date'], name='news_live_publish_idx'),
+        ),
+    ]
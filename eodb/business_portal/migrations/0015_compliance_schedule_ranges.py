@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:33
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def clamp_schedules(apps, schema_editor):
+    # Bring rows saved before the constraints existed into range.
+    ComplianceSchedule = apps.get_model('business_portal', 'ComplianceSchedule')
+    ComplianceSchedule.objects.filter(day_of_month__lt=1).update(day_of_month=1)
+    ComplianceSchedule.objects.filter(day_of_month__gt=31).update(day_of_month=31)
+    ComplianceSchedule.objects.filter(start_month__lt=1).update(start_month=1)
+    ComplianceSchedule.objects.filter(start_month__gt=12).update(start_month=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0014_live_row_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_schedules, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='complianceschedule',
+            name='day_of_month',
+            field=models.PositiveSmallIntegerField(default=20, help_text='Clamped to the last day of shorter months', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)]),
+        ),
+        migrations.AlterField(
+            model_name='complianceschedule',
+            name='start_month',
+            field=models.PositiveSmallIntegerField(default=1, help_text='First month of the cycle (1-12) for quarterly and annual schedules', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(12)]),
+        ),
+        migrations.AddConstraint(
+            model_name='complianceschedule',
+            constraint=models.CheckConstraint(condition=models.Q(('day_of_month__gte', 1), ('day_of_month__lte', 31)), name='compliance_schedule_day_of_month_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='complianceschedule',
+            constraint=models.CheckConstraint(condition=models.Q(('start_month__gte', 1), ('start_month__lte', 12)), name='compliance_schedule_start_month_range'),
+        ),
+    ]
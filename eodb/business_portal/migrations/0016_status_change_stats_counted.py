@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_counted(apps, schema_editor):
+    # Everything up to the old watermark is already in the statistics.
+    AnalyticsWatermark = apps.get_model('business_portal', 'AnalyticsWatermark')
+    ApplicationStatusChange = apps.get_model('business_portal', 'ApplicationStatusChange')
+    watermark = AnalyticsWatermark.objects.filter(job='processing_stats').values_list('value', flat=True).first()
+    if watermark:
+        ApplicationStatusChange.objects.filter(id__lte=watermark).update(stats_counted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('business_portal', '0015_compliance_schedule_ranges'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationstatuschange',
+            name='stats_counted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_counted, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='AnalyticsWatermark',
+        ),
+        migrations.AddIndex(
+            model_name='applicationstatuschange',
+            index=models.Index(condition=models.Q(('stats_counted', False), ('to_status__in', ['approved', 'rejected'])), fields=['id'], name='status_change_uncounted_idx'),
+        ),
+    ]
@@ -1,7 +1,29 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.core.validators import FileExtensionValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import FileExtensionValidator, MaxValueValidator, MinValueValidator
+from django.db import transaction
 from django.utils import timezone
+from django.utils.text import Truncator
+from datetime import date
+import calendar
+import secrets
+
+class ExcerptMixin:
+    # Maps excerpt field -> (source text field, length). Excerpts are stored so
+    # list pages can defer the full text columns.
+    EXCERPTS = {}
+
+    def refresh_excerpts(self):
+        for field, (source, length) in self.EXCERPTS.items():
+            setattr(self, field, Truncator(getattr(self, source) or '').chars(length))
+
+    def save(self, *args, **kwargs):
+        self.refresh_excerpts()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.EXCERPTS)
+        super().save(*args, **kwargs)
 
 class BusinessProfile(models.Model):
     BUSINESS_TYPES = [
@@ -28,33 +50,86 @@ class BusinessProfile(models.Model):
     def __str__(self):
         return self.business_name
 
-class GovernmentScheme(models.Model):
+class GovernmentScheme(ExcerptMixin, models.Model):
+    EXCERPTS = {
+        'excerpt': ('description', 150),
+        'eligibility_excerpt': ('eligibility', 100),
+        'benefits_excerpt': ('benefits', 100),
+    }
+
     name = models.CharField(max_length=255)
     description = models.TextField()
+    excerpt = models.CharField(max_length=255, blank=True, editable=False)
     eligibility = models.TextField()
+    eligibility_excerpt = models.CharField(max_length=255, blank=True, editable=False)
     benefits = models.TextField()
+    benefits_excerpt = models.CharField(max_length=255, blank=True, editable=False)
     application_process = models.TextField()
     website_link = models.URLField()
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
+    # Blank means the scheme is open to every type of business.
+    business_type = models.CharField(max_length=50, choices=BusinessProfile.BUSINESS_TYPES, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Partial indexes: public pages and the expire_content job only ever
+    # look at live rows, so expired history does not grow them.
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True), name='scheme_live_created_idx'),
+            models.Index(fields=['end_date', 'start_date'], condition=models.Q(is_active=True), name='scheme_live_window_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-class ApprovalType(models.Model):
+class ApprovalType(ExcerptMixin, models.Model):
+    EXCERPTS = {'excerpt': ('description', 200)}
+
     name = models.CharField(max_length=255)
     description = models.TextField()
+    excerpt = models.CharField(max_length=255, blank=True, editable=False)
     department = models.CharField(max_length=255)
     processing_time = models.CharField(max_length=100)
     fees = models.DecimalField(max_digits=10, decimal_places=2)
     required_documents = models.TextField()
+    # Blank means the approval applies to every type of business.
+    business_type = models.CharField(max_length=50, choices=BusinessProfile.BUSINESS_TYPES, null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'fees'], condition=models.Q(is_active=True), name='approval_type_live_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+class ApprovalTypeStats(models.Model):
+    # Materialized by the update_processing_stats command; see analytics.py.
+    approval_type = models.OneToOneField(ApprovalType, on_delete=models.CASCADE, primary_key=True, related_name='processing_stats')
+    decided_count = models.PositiveIntegerField(default=0)
+    approved_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    median_days = models.FloatField(null=True, blank=True)
+    p90_days = models.FloatField(null=True, blank=True)
+    sketch = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Processing stats for {self.approval_type_id}"
+
+    @property
+    def approval_rate(self):
+        return 100.0 * self.approved_count / self.decided_count if self.decided_count else None
+
+    @property
+    def rejection_rate(self):
+        return 100.0 * self.rejected_count / self.decided_count if self.decided_count else None
+
 class ApprovalApplication(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -75,9 +150,116 @@ class ApprovalApplication(models.Model):
     notes = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Review queue lease, see review_queue.claim. A lease only counts while
+    # lease_expires_at is in the future; after that the application is
+    # back in the queue without anything having to reset it.
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='review_claims')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    lease_token = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'submission_date'], name='application_queue_idx'),
+            models.Index(fields=['lease_token'], name='application_lease_token_idx'),
+        ]
+
+    # Allowed status changes; approved and rejected are final.
+    TRANSITIONS = {
+        'draft': {'submitted'},
+        'submitted': {'under_review', 'approved', 'rejected', 'additional_info_required'},
+        'under_review': {'approved', 'rejected', 'additional_info_required'},
+        'additional_info_required': {'submitted', 'under_review'},
+        'approved': set(),
+        'rejected': set(),
+    }
 
     def __str__(self):
-        return f"{self.application_number} - {self.approval_type.name}"
+        # Only name the approval type when it was loaded with the row, so
+        # listing applications never costs a query each.
+        if ApprovalApplication.approval_type.is_cached(self):
+            return f"{self.application_number} - {self.approval_type.name}"
+        return self.application_number
+
+    def can_transition(self, status):
+        return status in self.TRANSITIONS.get(self.status, set())
+
+    def transition_to(self, status, actor=None, from_status=None):
+        from_status = from_status or self.status
+        if status not in self.TRANSITIONS.get(from_status, set()):
+            raise ValidationError(
+                f"Cannot change status from '{from_status}' to '{status}'",
+                code='invalid_transition',
+            )
+        now = timezone.now()
+        with transaction.atomic():
+            # Only one of two concurrent transitions from the same status
+            # matches this row; it also holds the row lock until commit.
+            if not ApprovalApplication.objects.filter(pk=self.pk, status=from_status).update(status=status):
+                raise ValidationError(
+                    f"Application {self.application_number} is no longer '{from_status}'",
+                    code='stale_transition',
+                )
+            self.status = status
+            # Only write what the transition changes, so a concurrent edit
+            # of other fields (notes, a lease renewal) is not overwritten.
+            update_fields = ['status', 'updated_at']
+            if status == 'submitted':
+                self.submission_date = now
+                update_fields.append('submission_date')
+            elif status == 'approved':
+                self.approval_date = now
+                update_fields.append('approval_date')
+            if status != 'submitted':
+                # Leaving the review queue ends any lease on it.
+                self.claimed_by = None
+                self.lease_expires_at = None
+                self.lease_token = None
+                update_fields += ['claimed_by', 'lease_expires_at', 'lease_token']
+            self.save(update_fields=update_fields)
+            ApplicationStatusChange.objects.create(
+                application=self,
+                from_status=from_status,
+                to_status=status,
+                changed_at=now,
+                actor=actor,
+            )
+
+class ApplicationReceipt(models.Model):
+    # PDF rendered off the request path by receipts.generate_receipt; it is
+    # current while source_updated_at matches the application's updated_at.
+    application = models.OneToOneField(ApprovalApplication, on_delete=models.CASCADE, primary_key=True, related_name='receipt')
+    file = models.FileField(upload_to='receipts/')
+    source_updated_at = models.DateTimeField()
+    generated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Receipt for {self.application_id}"
+
+class ApplicationStatusChange(models.Model):
+    # Append-only history of ApprovalApplication.status, written by transition_to.
+    application = models.ForeignKey(ApprovalApplication, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=50, choices=ApprovalApplication.STATUS_CHOICES)
+    to_status = models.CharField(max_length=50, choices=ApprovalApplication.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Set once analytics.update_processing_stats has folded this decision in.
+    stats_counted = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['changed_at'], name='status_change_at_idx'),
+            models.Index(fields=['to_status', 'changed_at'], name='status_change_to_at_idx'),
+            models.Index(fields=['application', 'changed_at'], name='status_change_app_at_idx'),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(stats_counted=False, to_status__in=['approved', 'rejected']),
+                name='status_change_uncounted_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.application_id}: {self.from_status} -> {self.to_status}"
 
 class ApplicationDocument(models.Model):
     DOCUMENT_TYPES = [
@@ -99,10 +281,72 @@ class ApplicationDocument(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.application.application_number} - {self.get_document_type_display()}"
+        if ApplicationDocument.application.is_cached(self):
+            return f"{self.application.application_number} - {self.get_document_type_display()}"
+        return f"Application #{self.application_id} - {self.get_document_type_display()}"
+
+class ComplianceSchedule(models.Model):
+    FREQUENCY_CHOICES = [
+        ('monthly', 'Monthly'),
+        ('quarterly', 'Quarterly'),
+        ('annual', 'Annual'),
+    ]
+
+    # A schedule applies either to one business or to every business of a type.
+    business = models.ForeignKey(BusinessProfile, on_delete=models.CASCADE, null=True, blank=True)
+    business_type = models.CharField(max_length=50, choices=BusinessProfile.BUSINESS_TYPES, null=True, blank=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES)
+    day_of_month = models.PositiveSmallIntegerField(
+        default=20, validators=[MinValueValidator(1), MaxValueValidator(31)],
+        help_text="Clamped to the last day of shorter months")
+    start_month = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(12)],
+        help_text="First month of the cycle (1-12) for quarterly and annual schedules")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(business__isnull=False) | models.Q(business_type__isnull=False),
+                name='compliance_schedule_has_target',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(day_of_month__gte=1, day_of_month__lte=31),
+                name='compliance_schedule_day_of_month_range',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(start_month__gte=1, start_month__lte=12),
+                name='compliance_schedule_start_month_range',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.get_frequency_display()})"
+
+    def occurrences(self, start, end):
+        step = {'monthly': 1, 'quarterly': 3, 'annual': 12}[self.frequency]
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            if (month - self.start_month) % step == 0:
+                day = min(self.day_of_month, calendar.monthrange(year, month)[1])
+                due = date(year, month, day)
+                if start <= due <= end:
+                    yield due
+            month += 1
+            if month > 12:
+                year, month = year + 1, 1
+
+    def business_ids(self):
+        if self.business_id:
+            return [self.business_id]
+        return BusinessProfile.objects.filter(business_type=self.business_type).values_list('id', flat=True).iterator(chunk_size=2000)
 
 class Compliance(models.Model):
     business = models.ForeignKey(BusinessProfile, on_delete=models.CASCADE)
+    schedule = models.ForeignKey(ComplianceSchedule, on_delete=models.SET_NULL, null=True, blank=True)
     title = models.CharField(max_length=255)
     description = models.TextField()
     due_date = models.DateField()
@@ -111,18 +355,35 @@ class Compliance(models.Model):
     reminder_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'schedule', 'due_date'], name='unique_scheduled_compliance'),
+        ]
+        indexes = [
+            models.Index(fields=['business', '-due_date'], name='compliance_business_due_idx'),
+        ]
+
     def __str__(self):
         return f"{self.business.business_name} - {self.title}"
 
-class NewsArticle(models.Model):
+class NewsArticle(ExcerptMixin, models.Model):
+    EXCERPTS = {'excerpt': ('content', 150)}
+
     title = models.CharField(max_length=255)
     content = models.TextField()
+    excerpt = models.CharField(max_length=255, blank=True, editable=False)
     publish_date = models.DateField()
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to='news_images/', null=True, blank=True)
     source = models.CharField(max_length=255)
     source_url = models.URLField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-publish_date'], condition=models.Q(is_active=True), name='news_live_publish_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -131,8 +392,132 @@ class DigitalSignature(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     document = models.ForeignKey(ApplicationDocument, on_delete=models.CASCADE)
     signature_image = models.ImageField(upload_to='digital_signatures/')
+    # SHA-256 of the document bytes at signing time and an HMAC over it,
+    # see signing.py. Empty for signatures made before hashing existed.
+    document_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    signature = models.CharField(max_length=128, blank=True, editable=False)
+    algorithm = models.CharField(max_length=20, blank=True, editable=False)
     signed_at = models.DateTimeField(auto_now_add=True)
     is_valid = models.BooleanField(default=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.document.document_type}"
+
+# Archive tables for closed applications, filled by the archive_applications
+# command. Rows keep their original primary keys and file paths.
+
+class ArchivedApplication(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    business = models.ForeignKey(BusinessProfile, on_delete=models.CASCADE)
+    approval_type = models.ForeignKey(ApprovalType, on_delete=models.CASCADE)
+    application_number = models.CharField(max_length=50, unique=True)
+    status = models.CharField(max_length=50, choices=ApprovalApplication.STATUS_CHOICES)
+    submission_date = models.DateTimeField(null=True, blank=True)
+    approval_date = models.DateTimeField(null=True, blank=True)
+    rejection_reason = models.TextField(null=True, blank=True)
+    notes = models.TextField(null=True, blank=True)
+    status_history = models.JSONField(default=list)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.application_number
+
+class ArchivedDocument(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    application = models.ForeignKey(ArchivedApplication, on_delete=models.CASCADE, related_name='documents')
+    document_type = models.CharField(max_length=50, choices=ApplicationDocument.DOCUMENT_TYPES)
+    document = models.FileField(upload_to='application_documents/')
+    is_verified = models.BooleanField(default=False)
+    verification_notes = models.TextField(null=True, blank=True)
+    uploaded_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Application #{self.application_id} - {self.get_document_type_display()}"
+
+class ArchivedSignature(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    document = models.ForeignKey(ArchivedDocument, on_delete=models.CASCADE, related_name='signatures')
+    signature_image = models.ImageField(upload_to='digital_signatures/')
+    document_sha256 = models.CharField(max_length=64, blank=True)
+    signature = models.CharField(max_length=128, blank=True)
+    algorithm = models.CharField(max_length=20, blank=True)
+    signed_at = models.DateTimeField()
+    is_valid = models.BooleanField(default=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.document_id}"
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+class WebhookSubscription(models.Model):
+    # Receives events for one business or for every application of one
+    # approval type; see webhooks.record_status_change.
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret,
+                              help_text="Shared key for the X-EODB-Signature HMAC")
+    business = models.ForeignKey(BusinessProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='webhooks')
+    approval_type = models.ForeignKey(ApprovalType, on_delete=models.CASCADE, null=True, blank=True, related_name='webhooks')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(business__isnull=False) | models.Q(approval_type__isnull=False),
+                name='webhook_subscription_has_target',
+            ),
+        ]
+
+    def __str__(self):
+        return self.url
+
+class WebhookEvent(models.Model):
+    # Written in the same transaction as the change it describes, so an
+    # event exists if and only if the change committed.
+    event_type = models.CharField(max_length=50)
+    application_number = models.CharField(max_length=50)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['application_number', 'created_at'], name='webhook_event_app_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.application_number}"
+
+class WebhookDelivery(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.ForeignKey(WebhookEvent, on_delete=models.CASCADE, related_name='deliveries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    # Set by webhooks.claim_due for one dispatch round; its results are
+    # only written back to rows that still carry the round's token.
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subscription', 'event'], name='unique_webhook_delivery'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_delivery_due_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.document.document_type}"
\ No newline at end of file
+        return f"{self.event} -> {self.subscription}"
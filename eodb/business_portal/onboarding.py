@@ -0,0 +1,230 @@
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.mail import get_connection, send_mass_mail
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Value
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .metrics import EMAIL_SEND
+from .models import BusinessProfile
+
+PROFILE_FIELDS = [
+    'business_name', 'business_type', 'registration_number', 'address',
+    'contact_person', 'contact_number', 'date_established',
+]
+LOOKUP_CHUNK = 500
+
+
+class OnboardingError(Exception):
+    pass
+
+
+def clean_value(value):
+    # JSON numbers (a phone number, a numeric password) are taken as text;
+    # anything else that is not a string is rejected by validate_members.
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def parse_members(content, name=''):
+    """Rows from a CSV file or a JSON list (optionally under "members")."""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    stripped = content.lstrip()
+    if name.lower().endswith('.json') or stripped.startswith(('[', '{')):
+        try:
+            data = json.loads(content)
+        except ValueError as exc:
+            raise OnboardingError(f'Invalid JSON: {exc}')
+        if isinstance(data, dict):
+            data = data.get('members')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise OnboardingError('JSON must be a list of member objects')
+        rows = data
+    else:
+        rows = list(csv.DictReader(io.StringIO(content)))
+    max_rows = getattr(settings, 'ONBOARDING_MAX_ROWS', 5000)
+    if len(rows) > max_rows:
+        raise OnboardingError(f'At most {max_rows} members can be onboarded at once')
+    return [{k.strip(): clean_value(v) for k, v in row.items() if k} for row in rows]
+
+
+def existing_values(usernames, registration_numbers):
+    """
+    Which usernames and registration numbers are already taken, as one
+    UNION query per chunk instead of a lookup per row.
+    """
+    taken = {'username': set(), 'registration_number': set()}
+    usernames, registration_numbers = list(usernames), list(registration_numbers)
+    for i in range(0, max(len(usernames), len(registration_numbers)), LOOKUP_CHUNK):
+        users = User.objects.filter(username__in=usernames[i:i + LOOKUP_CHUNK]).values_list(
+            'username', Value('username', output_field=CharField()))
+        profiles = BusinessProfile.objects.filter(
+            registration_number__in=registration_numbers[i:i + LOOKUP_CHUNK]
+        ).values_list('registration_number', Value('registration_number', output_field=CharField()))
+        for value, kind in users.union(profiles, all=True):
+            taken[kind].add(value)
+    return taken
+
+
+def validate_members(rows):
+    """
+    Build unsaved (User, BusinessProfile, password) triples for the valid
+    rows. Returns (members, errors) where errors maps 1-based row numbers
+    to messages. Model validation runs without its per-row uniqueness
+    queries; uniqueness is checked for the whole batch at once. Supplied
+    passwords go through AUTH_PASSWORD_VALIDATORS.
+    """
+    members, errors = [], {}
+    seen_usernames, seen_registrations = set(), set()
+    for number, row in enumerate(rows, start=1):
+        not_text = [field for field, value in row.items() if value is not None and not isinstance(value, str)]
+        if not_text:
+            errors[number] = [f'{field}: must be text' for field in not_text]
+            continue
+        username = row.get('username') or ''
+        email = row.get('email') or ''
+        problems = []
+        user = User(username=username, email=email,
+                    first_name=row.get('first_name') or '', last_name=row.get('last_name') or '')
+        try:
+            # Lengths as well as the username rules; the email is required
+            # here, unlike on User, so it is checked on its own.
+            user.full_clean(exclude=['password', 'email'], validate_unique=False)
+        except ValidationError as exc:
+            problems += [f'{field}: {messages[0]}' for field, messages in exc.message_dict.items()]
+        try:
+            validate_email(email)
+        except ValidationError:
+            problems.append('email: Enter a valid email address.')
+        profile = BusinessProfile(email=row.get('business_email') or email,
+                                  **{field: row.get(field) or None for field in PROFILE_FIELDS})
+        try:
+            profile.full_clean(exclude=['user'], validate_unique=False)
+        except ValidationError as exc:
+            problems += [f'{field}: {messages[0]}' for field, messages in exc.message_dict.items()]
+        password = row.get('password') or None
+        if password:
+            try:
+                validate_password(password, user)
+            except ValidationError as exc:
+                problems += [f'password: {message}' for message in exc.messages]
+        if username in seen_usernames:
+            problems.append(f'username: {username} appears more than once')
+        if profile.registration_number in seen_registrations:
+            problems.append(f'registration_number: {profile.registration_number} appears more than once')
+        seen_usernames.add(username)
+        seen_registrations.add(profile.registration_number)
+        if problems:
+            # The profile email defaults to the user's, so its error may repeat.
+            errors[number] = list(dict.fromkeys(problems))
+            continue
+        members.append((number, user, profile, password))
+
+    taken = existing_values([m[1].username for m in members], [m[2].registration_number for m in members])
+    valid = []
+    for number, user, profile, password in members:
+        problems = []
+        if user.username in taken['username']:
+            problems.append(f'username: {user.username} is already registered')
+        if profile.registration_number in taken['registration_number']:
+            problems.append(f'registration_number: {profile.registration_number} is already registered')
+        if problems:
+            errors[number] = problems
+        else:
+            valid.append((user, profile, password))
+    return valid, errors
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash with the configured hasher across processes; it is CPU bound by design."""
+    workers = workers or getattr(settings, 'ONBOARDING_HASH_WORKERS', None)
+    if len(passwords) < 2 or workers == 1:
+        return [make_password(p) for p in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def set_password_link(user, base_url):
+    path = reverse('password_reset_confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    })
+    return base_url.rstrip('/') + path
+
+
+def send_set_password_links(users, base_url):
+    messages = [
+        (
+            'Your Delhi EODB Portal account',
+            f'Hello {user.first_name or user.username},\n\n'
+            f'An account has been created for your business. Choose a password here:\n\n'
+            f'{set_password_link(user, base_url)}\n\n'
+            f'Your username is {user.username}.',
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email],
+        )
+        for user in users
+    ]
+    connection = get_connection(fail_silently=True)
+    with EMAIL_SEND.time(kind='onboarding'):
+        return send_mass_mail(messages, fail_silently=True, connection=connection)
+
+
+def onboard(rows, base_url, dry_run=False, workers=None):
+    """
+    Create users and business profiles for every valid row with two
+    bulk INSERTs. Members with a password get it hashed across workers
+    processes (1 hashes in the calling thread, as web requests must); the
+    rest get an unusable password and an emailed one-time set-password
+    link. Returns a summary dict.
+    """
+    members, errors = validate_members(rows)
+    summary = {'rows': len(rows), 'created': 0, 'links_sent': 0,
+               'errors': {str(number): problems for number, problems in sorted(errors.items())}}
+    if dry_run or not members:
+        summary['valid'] = len(members)
+        return summary
+
+    with_password = [(user, password) for user, profile, password in members if password]
+    for (user, password), hashed in zip(with_password, hash_passwords([p for u, p in with_password], workers)):
+        user.password = hashed
+    for user, profile, password in members:
+        if not password:
+            user.set_unusable_password()
+
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create([user for user, profile, password in members], batch_size=500)
+            for user, (_, profile, password) in zip(users, members):
+                profile.user = user
+            BusinessProfile.objects.bulk_create([profile for user, profile, password in members], batch_size=500)
+    except IntegrityError:
+        raise OnboardingError('Another registration took one of these usernames or registration numbers; '
+                              'nothing was created, please retry')
+
+    summary['created'] = len(users)
+    invited = [user for user, profile, password in members if not password]
+    if invited:
+        summary['links_sent'] = send_set_password_links(invited, base_url)
+    return summary
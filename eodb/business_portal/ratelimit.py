@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    # '30/m' -> (30 tokens, 60 seconds)
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0].lower()]
+
+
+class LocalBuckets:
+    """
+    Token buckets kept in this process, for when Redis is not configured.
+    Each worker then limits on its own, so the effective rate is per
+    worker.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.buckets = {}
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate, now, ttl):
+        with self.lock:
+            if len(self.buckets) >= self.max_entries and key not in self.buckets:
+                self.buckets.clear()
+            tokens, last = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - last) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / refill_rate
+            self.buckets[key] = (tokens, now)
+            return wait
+
+
+local_buckets = LocalBuckets()
+
+# Same refill-and-take as LocalBuckets.take, run atomically inside Redis.
+# The wait is returned as a string because Redis truncates Lua numbers.
+TAKE_SCRIPT = """
+local capacity, rate, now, ttl = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets in the 'shared' Redis cache, one round trip per take."""
+
+    def __init__(self, cache):
+        self.client = cache._cache.get_client(write=True)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, capacity, refill_rate, now, ttl):
+        return float(self.script(keys=[key], args=[capacity, refill_rate, now, ttl]))
+
+
+_redis_buckets = None
+
+
+def bucket_store(cache_alias):
+    """
+    Redis when the shared cache is Redis, otherwise this process's dict.
+    The database cache is never used: it would cost queries on every
+    request before the view runs.
+    """
+    global _redis_buckets
+    if _redis_buckets is None:
+        cache = caches[cache_alias]
+        _redis_buckets = RedisBuckets(cache) if isinstance(cache, RedisCache) else False
+    return _redis_buckets or local_buckets
+
+
+class TokenBucket:
+    """
+    Token bucket limiter: each key holds up to capacity tokens, refilled
+    continuously at capacity / period, and every request takes one.
+    """
+
+    def __init__(self, rate, cache_alias='shared', prefix='rl'):
+        self.capacity, self.period = parse_rate(rate)
+        self.refill_rate = self.capacity / self.period
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+
+    def consume(self, key, now=None):
+        """
+        Take one token for key. Returns 0 when allowed, otherwise the number
+        of seconds until a token is available.
+        """
+        # Wall-clock time, since buckets in Redis span processes.
+        now = now or time.time()
+        cache_key = f'{self.prefix}:{key}'
+        args = (cache_key, self.capacity, self.refill_rate, now, self.period)
+        try:
+            return bucket_store(self.cache_alias).take(*args)
+        except Exception:
+            return local_buckets.take(*args)
+
+
+def client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def ratelimit(rate=None, scope='api'):
+    """
+    Reject requests over the limit with 429 before the view runs.
+
+    Requests are limited per client IP and, when an X-API-Key header is
+    sent, per API key as well.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not getattr(settings, 'RATELIMIT_ENABLE', True):
+                return view(request, *args, **kwargs)
+            bucket = TokenBucket(rate or settings.API_RATE_LIMIT, prefix=f'rl:{scope}')
+            keys = [f'ip:{client_ip(request)}']
+            api_key = request.headers.get('X-API-Key')
+            if api_key:
+                keys.append(f'key:{api_key}')
+            wait = max(bucket.consume(key) for key in keys)
+            if wait:
+                response = JsonResponse({'error': 'Rate limit exceeded'}, status=429)
+                response['Retry-After'] = str(math.ceil(round(wait, 3)))
+                return response
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
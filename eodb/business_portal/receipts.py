@@ -0,0 +1,164 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ApplicationReceipt, ApplicationDocument, ApprovalApplication
+
+logger = logging.getLogger(__name__)
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+LINE_HEIGHT = 16
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+
+_executor = None
+
+
+def pdf_text(value):
+    # Core PDF fonts only cover Latin-1.
+    value = str(value).replace('₹', 'Rs. ')
+    value = value.encode('latin-1', 'replace').decode('latin-1')
+    return value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(lines, title='Receipt'):
+    """Render plain text lines into a minimal multi-page PDF (Helvetica)."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    bold = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+    page_ids = []
+    for page_lines in pages:
+        commands = ['BT', f'{MARGIN} {PAGE_HEIGHT - MARGIN} Td', f'{LINE_HEIGHT} TL']
+        for line in page_lines:
+            heading = line.startswith('# ')
+            text = line[2:] if heading else line
+            commands.append(f'/{"F2" if heading else "F1"} {13 if heading else 10} Tf')
+            commands.append(f'({pdf_text(text)}) Tj T*')
+        commands.append('ET')
+        stream = '\n'.join(commands).encode('latin-1')
+        content = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>'
+            % (pages_obj, PAGE_WIDTH, PAGE_HEIGHT, font, bold, content)
+        ))
+    objects[catalog - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_obj
+    objects[pages_obj - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % i for i in page_ids), len(page_ids))
+    info = add(b'<< /Title (%s) /Producer (Delhi EODB Portal) >>' % pdf_text(title).encode('latin-1'))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%EOF\n' % (
+        len(objects) + 1, catalog, info, xref)
+    return bytes(out)
+
+
+def receipt_lines(application, documents):
+    business = application.business
+    approval_type = application.approval_type
+    fmt = '%d %b %Y %H:%M'
+    lines = [
+        '# Delhi EODB Portal - Application Receipt',
+        '',
+        f'Application Number: {application.application_number}',
+        f'Approval Type: {approval_type.name}',
+        f'Department: {approval_type.department}',
+        f'Fees: ₹{approval_type.fees}',
+        f'Status: {application.get_status_display()}',
+        f'Submitted On: {application.submission_date.strftime(fmt) if application.submission_date else "Not submitted"}',
+        f'Last Updated: {application.updated_at.strftime(fmt)}',
+        '',
+        '# Business',
+        f'Name: {business.business_name}',
+        f'Registration Number: {business.registration_number}',
+        f'Contact: {business.contact_person} ({business.contact_number})',
+        '',
+        f'# Documents ({len(documents)})',
+    ]
+    for document in documents:
+        status = 'Verified' if document.is_verified else 'Pending'
+        lines.append(f'- {document.get_document_type_display()}: {document.document.name.rsplit("/", 1)[-1]} '
+                     f'({status}, uploaded {document.uploaded_at.strftime(fmt)})')
+    if application.notes:
+        lines += ['', '# Notes'] + application.notes.splitlines()
+    lines += ['', f'Generated {timezone.now().strftime(fmt)} UTC']
+    return lines
+
+
+def is_fresh(receipt, application):
+    return bool(receipt and receipt.file and receipt.source_updated_at == application.updated_at)
+
+
+def generate_receipt(application_id, force=False):
+    """Render and store the receipt unless the stored one is still current."""
+    application = ApprovalApplication.objects.select_related(
+        'business', 'approval_type', 'receipt'
+    ).filter(pk=application_id).first()
+    if application is None:
+        return None
+    try:
+        receipt = application.receipt
+    except ApplicationReceipt.DoesNotExist:
+        receipt = None
+    if not force and is_fresh(receipt, application):
+        return receipt
+
+    documents = list(ApplicationDocument.objects.filter(application=application).order_by('uploaded_at'))
+    pdf = build_pdf(receipt_lines(application, documents), title=f'Receipt {application.application_number}')
+    version = application.updated_at.strftime('%Y%m%d%H%M%S%f')
+    old_name = receipt.file.name if receipt and receipt.file else None
+    receipt = receipt or ApplicationReceipt(application=application)
+    receipt.file.save(f'{application.application_number}-{version}.pdf', ContentFile(pdf), save=False)
+    receipt.source_updated_at = application.updated_at
+    receipt.save()
+    if old_name and old_name != receipt.file.name:
+        receipt.file.storage.delete(old_name)
+    return receipt
+
+
+def _run(application_id):
+    close_old_connections()
+    try:
+        generate_receipt(application_id)
+    except Exception:
+        logger.exception('Failed to render receipt for application %s', application_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_receipt(application_id):
+    """
+    Render the receipt off the request path once the current transaction
+    commits. With RECEIPTS_ASYNC off (tests, management commands) it runs
+    inline instead.
+    """
+    def submit():
+        global _executor
+        if not getattr(settings, 'RECEIPTS_ASYNC', True):
+            generate_receipt(application_id)
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'RECEIPT_WORKERS', 2),
+                                           thread_name_prefix='receipts')
+        _executor.submit(_run, application_id)
+    transaction.on_commit(submit)
@@ -0,0 +1,91 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .metrics import EMAIL_SEND
+from .models import Compliance
+
+REMINDER_DAYS = 7
+BATCH_SIZE = 500
+
+
+def pending_reminders(today=None, days=REMINDER_DAYS):
+    today = today or timezone.now().date()
+    return Compliance.objects.filter(
+        is_completed=False,
+        reminder_sent=False,
+        due_date__lte=today + timedelta(days=days),
+    ).select_related('business__user').order_by('business__user_id', 'due_date')
+
+
+def build_digests(compliances, today=None, days=REMINDER_DAYS):
+    """
+    Group compliances (ordered by owner) into one reminder per user.
+
+    Yields (message, compliance_ids) where message is a send_mass_mail
+    tuple, or None when the user has no email address.
+    """
+    today = today or timezone.now().date()
+    for user_id, items in groupby(compliances, key=lambda c: c.business.user_id):
+        items = list(items)
+        user = items[0].business.user
+        message = None
+        if user.email:
+            body = render_to_string('business_portal/emails/compliance_digest.txt', {
+                'user': user,
+                'overdue': [c for c in items if c.due_date < today],
+                'due_soon': [c for c in items if c.due_date >= today],
+                'days': days,
+            })
+            subject = f'Compliance Reminder: {len(items)} item{"s" if len(items) != 1 else ""} need your attention'
+            message = (subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+        yield message, [c.id for c in items]
+
+
+def send_compliance_digests(compliances, today=None, days=REMINDER_DAYS, batch_size=BATCH_SIZE):
+    """
+    Send one digest per user over a single mail connection and flag the
+    compliances as reminded. Only the compliances whose digest was accepted
+    by the mail server are flagged; the rest are retried on the next run.
+    Users without an email address are flagged, since nothing can ever be
+    sent to them. Returns (emails sent, compliances covered).
+    """
+    connection = get_connection(fail_silently=True)
+    connection.open()
+    sent = covered = 0
+    batch, unreachable = [], []
+
+    def flush():
+        nonlocal sent, covered
+        delivered = list(unreachable)
+        if batch:
+            with EMAIL_SEND.time(kind='compliance_digest'):
+                # One message at a time on the open connection, so a failed
+                # one is known and its compliances stay unflagged.
+                for (subject, body, from_email, recipients), ids in batch:
+                    message = EmailMessage(subject, body, from_email, recipients, connection=connection)
+                    if connection.send_messages([message]):
+                        sent += 1
+                        delivered.extend(ids)
+        if delivered:
+            Compliance.objects.filter(id__in=delivered).update(reminder_sent=True)
+            covered += len(delivered)
+        batch.clear()
+        unreachable.clear()
+
+    try:
+        for message, ids in build_digests(compliances, today=today, days=days):
+            if message:
+                batch.append((message, ids))
+            else:
+                unreachable.extend(ids)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        connection.close()
+    return sent, covered
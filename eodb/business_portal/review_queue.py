@@ -0,0 +1,135 @@
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import ApprovalApplication
+
+MAX_ATTEMPTS = 5
+# What a reviewer can decide from the queue. 'under_review' is left out:
+# it would take the application out of 'submitted', ending the lease, and
+# the queue only ever hands out submitted applications.
+DECISIONS = ('approved', 'rejected', 'additional_info_required')
+
+
+class LeaseLost(Exception):
+    """The reviewer's lease expired or the application left the queue."""
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'REVIEW_LEASE_SECONDS', 15 * 60))
+
+
+def claimable(now, department=None):
+    applications = ApprovalApplication.objects.filter(status='submitted').filter(
+        Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    )
+    if department:
+        applications = applications.filter(approval_type__department=department)
+    return applications
+
+
+def _lease(user, token, now, ids):
+    return claimable(now).filter(id__in=ids).update(
+        claimed_by=user, lease_expires_at=now + lease_duration(), lease_token=token,
+    )
+
+
+def _claim_batch(user, token, department, wanted):
+    now = timezone.now()
+    oldest_first = claimable(now, department).order_by('submission_date', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        # Rows another reviewer is claiming right now are skipped rather
+        # than waited on.
+        with transaction.atomic():
+            ids = list(oldest_first.select_for_update(skip_locked=True, of=('self',))
+                       .values_list('id', flat=True)[:wanted])
+            return len(ids), _lease(user, token, now, ids) if ids else 0
+    # Without SKIP LOCKED (SQLite) every reviewer would read the same head
+    # of the queue and race for it. Sampling from a wider window of the
+    # oldest items spreads concurrent claims. The read runs outside any
+    # transaction so the write lock is only held for the UPDATE itself.
+    window = list(oldest_first.values_list('id', flat=True)[:max(wanted * 10, 100)])
+    ids = sorted(random.sample(window, min(wanted, len(window))))
+    return len(ids), _lease(user, token, now, ids) if ids else 0
+
+
+def claim(user, count=1, department=None):
+    """
+    Lease up to count of the oldest submitted applications to user, across
+    all departments or one. Each attempt is a single conditional UPDATE
+    that only touches rows still unclaimed (or whose lease has expired), so
+    two reviewers can never hold the same application. Returns the claimed
+    applications.
+    """
+    token = uuid.uuid4()
+    claimed = 0
+    for _ in range(MAX_ATTEMPTS):
+        wanted = count - claimed
+        if wanted <= 0:
+            break
+        candidates, leased = _claim_batch(user, token, department, wanted)
+        if not candidates:
+            break
+        claimed += leased
+    return list(
+        ApprovalApplication.objects.filter(lease_token=token)
+        .select_related('business', 'approval_type')
+        .order_by('submission_date', 'id')
+    )
+
+
+def held_by(user, now=None):
+    now = now or timezone.now()
+    return ApprovalApplication.objects.filter(status='submitted', claimed_by=user, lease_expires_at__gt=now)
+
+
+def renew(user, application_ids):
+    now = timezone.now()
+    return held_by(user, now).filter(id__in=application_ids).update(lease_expires_at=now + lease_duration())
+
+
+def release(user, application_ids):
+    return held_by(user).filter(id__in=application_ids).update(
+        claimed_by=None, lease_expires_at=None, lease_token=None,
+    )
+
+
+def decide(application_id, user, status):
+    """
+    Move a leased application to status on behalf of its reviewer. The
+    conditional UPDATE both checks the lease and locks the row until the
+    transition commits, so an expiring lease cannot be re-claimed midway.
+    """
+    if status not in DECISIONS:
+        raise ValidationError(f"'{status}' is not a review decision", code='invalid_decision')
+    with transaction.atomic():
+        now = timezone.now()
+        if not held_by(user, now).filter(pk=application_id).update(lease_expires_at=now + lease_duration()):
+            raise LeaseLost(application_id)
+        application = ApprovalApplication.objects.get(pk=application_id)
+        application.transition_to(status, actor=user)
+    return application
+
+
+def queue_depth(now=None):
+    """Submitted applications per department, split into available and leased."""
+    now = now or timezone.now()
+    leased = Q(lease_expires_at__gt=now)
+    available = Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+    return list(
+        ApprovalApplication.objects.filter(status='submitted')
+        .values('approval_type__department')
+        .annotate(
+            total=Count('id'),
+            leased=Count('id', filter=leased),
+            available=Count('id', filter=available),
+            oldest=Min('submission_date'),
+        )
+        .order_by('approval_type__department')
+    )
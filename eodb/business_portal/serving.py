@@ -0,0 +1,120 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse
+)
+from django.utils.http import content_disposition_header, http_date
+from django.views.static import was_modified_since
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+# Compressed files are served as the archive they are; a Content-Encoding
+# header would make browsers unpack them on download.
+ENCODED_TYPES = {
+    'bzip2': 'application/x-bzip',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+}
+
+
+def parse_range(header, size):
+    # Only a single byte range is supported; anything else falls back to a
+    # full 200 response, which RFC 9110 allows.
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    start, end = match.groups()
+    if start == '' and end == '':
+        return None
+    if start == '':
+        length = int(end)
+        if length == 0:
+            return False
+        start = max(size - length, 0)
+        end = size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(fh, start, end, chunk_size=CHUNK_SIZE):
+    try:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = fh.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        fh.close()
+
+
+def sendfile_response(name, path, content_type):
+    backend = getattr(settings, 'SENDFILE_BACKEND', None)
+    response = HttpResponse(content_type=content_type)
+    if backend == 'nginx':
+        prefix = getattr(settings, 'SENDFILE_URL', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name.lstrip('/')
+    elif backend == 'xsendfile':
+        response['X-Sendfile'] = path
+    else:
+        return None
+    return response
+
+
+def serve_protected_file(request, field_file, as_attachment=False):
+    """
+    Stream a stored FileField to an already-authorized user.
+
+    Honours If-Modified-Since and single Range requests, and hands the
+    transfer to the front-end server when SENDFILE_BACKEND is configured.
+    """
+    if not field_file:
+        raise Http404('No file attached')
+    path = field_file.path
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('File not found')
+
+    filename = os.path.basename(field_file.name)
+    content_type, encoding = mimetypes.guess_type(filename)
+    content_type = ENCODED_TYPES.get(encoding, content_type) or 'application/octet-stream'
+
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    response = sendfile_response(field_file.name, path, content_type)
+    if response is None:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(open(path, 'rb'), start, end),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response.block_size = CHUNK_SIZE
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .facets import APPROVAL_TYPE_FACETS, SCHEME_FACETS
+from .models import ApplicationStatusChange, ApprovalApplication, ApprovalType, GovernmentScheme
+from .receipts import schedule_receipt
+from .webhooks import record_status_change
+
+
+@receiver(post_save, sender=ApprovalApplication)
+def refresh_receipt(sender, instance, raw=False, **kwargs):
+    # Drafts have nothing to print yet.
+    if not raw and instance.status != 'draft':
+        schedule_receipt(instance.pk)
+
+
+@receiver(post_save, sender=ApplicationStatusChange)
+def queue_webhooks(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        record_status_change(instance)
+
+
+@receiver([post_save, post_delete], sender=ApprovalType)
+def invalidate_approval_type_facets(sender, **kwargs):
+    APPROVAL_TYPE_FACETS.invalidate()
+
+
+@receiver([post_save, post_delete], sender=GovernmentScheme)
+def invalidate_scheme_facets(sender, **kwargs):
+    SCHEME_FACETS.invalidate()
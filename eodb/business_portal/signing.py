@@ -0,0 +1,54 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+
+ALGORITHM = 'hmac-sha256'
+CHUNK_SIZE = 1024 * 1024
+
+
+def signing_key():
+    key = getattr(settings, 'DOCUMENT_SIGNING_KEY', None) or settings.SECRET_KEY
+    return key.encode() if isinstance(key, str) else key
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def signature_payload(document_id, user_id, sha256):
+    return f'{ALGORITHM}:{document_id}:{user_id}:{sha256}'.encode()
+
+
+def sign(document_id, user_id, sha256, key=None):
+    """HMAC over the document hash, bound to the document and the signer."""
+    return hmac.new(key or signing_key(), signature_payload(document_id, user_id, sha256), hashlib.sha256).hexdigest()
+
+
+def sign_document(signature):
+    """Fill in the hash and HMAC of a DigitalSignature before it is saved."""
+    signature.document_sha256 = hash_file(signature.document.document.path)
+    signature.signature = sign(signature.document_id, signature.user_id, signature.document_sha256)
+    signature.algorithm = ALGORITHM
+    return signature
+
+
+def verify(path, document_id, user_id, sha256, signature, key=None):
+    """
+    True when the file still hashes to sha256 and the HMAC matches. A
+    missing file is treated as invalid; None means the file exists but
+    could not be read (permissions, I/O errors), so nothing is known.
+    """
+    expected = sign(document_id, user_id, sha256, key=key)
+    if not hmac.compare_digest(expected, signature):
+        return False
+    try:
+        return hmac.compare_digest(hash_file(path), sha256)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return None
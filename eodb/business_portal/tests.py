@@ -1,3 +1,1112 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+import zipfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.utils.text import Truncator
+
+from . import metrics, ratelimit, review_queue, signing, warmup, webhooks
+from .analytics import QuantileSketch, apply_decisions, rebuild_processing_stats, update_processing_stats
+from .archive import archive_batch
+from .facets import SCHEME_FACETS, VERSION_TTL
+from .lifecycle import expire_content
+from .management.commands import profile_views
+from .models import (
+    ApplicationDocument, ApplicationStatusChange, ApprovalApplication, ApprovalType, ApprovalTypeStats,
+    ArchivedApplication, BusinessProfile, Compliance, ComplianceSchedule, DigitalSignature, GovernmentScheme,
+    NewsArticle, WebhookDelivery, WebhookSubscription
+)
+from .onboarding import onboard, parse_members
+from .reminders import pending_reminders, send_compliance_digests
+from .serving import parse_range
+from .uploads import UploadLimitExceeded, bulk_upload
+from .views import generate_application_number
+
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg=='
+)
+
+
+def create_business(username, registration_number, **extra):
+    user = User.objects.create_user(username, email=f'{username}@example.com', password='secret', **extra)
+    return BusinessProfile.objects.create(
+        user=user, business_name=f'{username} Traders', business_type='retail',
+        registration_number=registration_number, address='Delhi', contact_person='Asha',
+        contact_number='9999999999', email=user.email, date_established=date(2020, 1, 1),
+    )
+
+
+def create_application(business, number, department='Trade', **extra):
+    approval_type = ApprovalType.objects.create(
+        name=f'Licence {number}', department=department, description='Licence',
+        processing_time='7 days', fees=100, required_documents='PAN',
+    )
+    return ApprovalApplication.objects.create(
+        business=business, approval_type=approval_type, application_number=f'APP-{number}', **extra
+    )
+
+
+@override_settings(RECEIPTS_ASYNC=False)
+class QueryCountTests(TestCase):
+    """Each view must cost the same number of queries however many rows it shows."""
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = User.objects.create_user('owner', email='owner@example.com', password='secret')
+        self.business = BusinessProfile.objects.create(
+            user=self.user, business_name='Acme Traders', business_type='retail',
+            registration_number='REG-1', address='Delhi', contact_person='Asha',
+            contact_number='9999999999', email='owner@example.com', date_established=date(2020, 1, 1),
+        )
+        self.client.force_login(self.user)
+
+    def create_application(self, number, documents=0):
+        approval_type = ApprovalType.objects.create(
+            name=f'Licence {number}', department='Trade', description='Licence',
+            processing_time='7 days', fees=100, required_documents='PAN',
+        )
+        application = ApprovalApplication.objects.create(
+            business=self.business, approval_type=approval_type, application_number=f'APP-{number}',
+        )
+        for i in range(documents):
+            ApplicationDocument.objects.create(
+                application=application, document_type='pan',
+                document=SimpleUploadedFile(f'doc{number}-{i}.pdf', b'%PDF-1.4'),
+            )
+        return application
+
+    def assertConstantQueries(self, url, grow, expected):
+        # The first request also warms the template fragment cache.
+        self.client.get(url)
+        with self.assertNumQueries(expected):
+            self.client.get(url)
+        grow()
+        with self.assertNumQueries(expected):
+            self.client.get(url)
+
+    def test_dashboard(self):
+        self.create_application(0)
+        self.assertConstantQueries(
+            reverse('dashboard'),
+            lambda: [self.create_application(n) for n in range(1, 5)],
+            expected=6,
+        )
+
+    def test_application_details(self):
+        application = self.create_application(0, documents=1)
+
+        def add_documents():
+            for i in range(4):
+                ApplicationDocument.objects.create(
+                    application=application, document_type='address',
+                    document=SimpleUploadedFile(f'extra-{i}.pdf', b'%PDF-1.4'),
+                )
+
+        self.assertConstantQueries(
+            reverse('application_details', args=[application.id]), add_documents, expected=4,
+        )
+
+    def test_add_signature(self):
+        application = self.create_application(0, documents=1)
+        document = application.applicationdocument_set.get()
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('add_signature', args=[document.id]))
+        self.assertContains(response, application.application_number)
+
+    def test_str_does_not_query(self):
+        self.create_application(0, documents=1)
+        applications = list(ApprovalApplication.objects.all())
+        documents = list(ApplicationDocument.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(str(applications[0]), 'APP-0')
+            self.assertEqual(str(documents[0]), f'Application #{applications[0].id} - PAN Card')
+        document = ApplicationDocument.objects.select_related('application').get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(document), 'APP-0 - PAN Card')
+        application = ApprovalApplication.objects.select_related('approval_type').get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(application), 'APP-0 - Licence 0')
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+        self.assertEqual(parse_range('bytes=990-5000', 1000), (990, 999))
+
+    def test_ignored_headers(self):
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-9'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=1000-', 'bytes=5-4', 'bytes=-0'):
+            self.assertIs(parse_range(header, 1000), False, header)
+
+
+@override_settings(RECEIPTS_ASYNC=False, SENDFILE_BACKEND=None)
+class DownloadDocumentTests(TestCase):
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.business = create_business('owner', 'REG-1')
+        application = create_application(self.business, 1)
+        self.document = ApplicationDocument.objects.create(
+            application=application, document_type='pan',
+            document=SimpleUploadedFile('rapport é.pdf.gz', b'0123456789'),
+        )
+        self.url = reverse('download_document', args=[self.document.id])
+
+    def test_owner_and_staff_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(create_business('other', 'REG-2').user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(User.objects.create_user('clerk', is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(self.business.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_headers(self):
+        self.client.force_login(self.business.user)
+        response = self.client.get(self.url + '?download')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertNotIn('Content-Encoding', response)
+        name = os.path.basename(self.document.document.name)
+        self.assertIn('é', name)
+        self.assertEqual(response['Content-Disposition'], content_disposition_header(True, name))
+        self.assertTrue(response['Content-Disposition'].startswith("attachment; filename*=utf-8''"))
+
+    def test_range(self):
+        self.client.force_login(self.business.user)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 6-9/10')
+        self.assertEqual(b''.join(response.streaming_content), b'6789')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+
+class ComplianceScheduleTests(TestCase):
+
+    def schedule(self, frequency, day_of_month=20, start_month=1):
+        return ComplianceSchedule(title='Return', description='File it', business_type='retail',
+                                  frequency=frequency, day_of_month=day_of_month, start_month=start_month)
+
+    def test_month_end_clamping(self):
+        occurrences = list(self.schedule('monthly', day_of_month=31).occurrences(date(2024, 1, 1), date(2024, 4, 30)))
+        self.assertEqual(occurrences, [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+
+    def test_quarterly(self):
+        occurrences = list(self.schedule('quarterly', day_of_month=15, start_month=2).occurrences(
+            date(2024, 2, 16), date(2025, 2, 15)))
+        self.assertEqual(occurrences, [date(2024, 5, 15), date(2024, 8, 15), date(2024, 11, 15), date(2025, 2, 15)])
+
+    def test_annual(self):
+        occurrences = list(self.schedule('annual', day_of_month=30, start_month=4).occurrences(
+            date(2024, 1, 1), date(2026, 12, 31)))
+        self.assertEqual(occurrences, [date(2024, 4, 30), date(2025, 4, 30), date(2026, 4, 30)])
+
+    def test_ranges_are_validated(self):
+        for field, value in (('day_of_month', 0), ('day_of_month', 32), ('start_month', 0), ('start_month', 13)):
+            schedule = self.schedule('monthly', **{field: value})
+            with self.assertRaises(ValidationError) as cm:
+                schedule.full_clean()
+            self.assertIn(field, cm.exception.message_dict)
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                schedule.save()
+
+
+@override_settings(RECEIPTS_ASYNC=False)
+class TransitionTests(TestCase):
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.business = create_business('owner', 'REG-1')
+        self.application = create_application(self.business, 1)
+
+    def test_records_history(self):
+        self.application.transition_to('submitted', actor=self.business.user)
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, 'submitted')
+        self.assertIsNotNone(self.application.submission_date)
+        change = self.application.status_changes.get()
+        self.assertEqual((change.from_status, change.to_status, change.actor), ('draft', 'submitted', self.business.user))
+
+    def test_illegal_transition(self):
+        with self.assertRaises(ValidationError) as cm:
+            self.application.transition_to('approved')
+        self.assertEqual(cm.exception.code, 'invalid_transition')
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, 'draft')
+        self.assertFalse(self.application.status_changes.exists())
+
+    def test_leaving_submitted_clears_lease(self):
+        reviewer = User.objects.create_user('reviewer', is_staff=True)
+        self.application.transition_to('submitted')
+        ApprovalApplication.objects.filter(pk=self.application.pk).update(
+            claimed_by=reviewer, lease_expires_at=timezone.now() + timedelta(minutes=5), lease_token=uuid.uuid4())
+        self.application.refresh_from_db()
+        self.application.transition_to('approved', actor=reviewer)
+        self.application.refresh_from_db()
+        self.assertIsNone(self.application.claimed_by)
+        self.assertIsNone(self.application.lease_expires_at)
+        self.assertIsNone(self.application.lease_token)
+        self.assertIsNotNone(self.application.approval_date)
+
+    def test_keeps_concurrent_edits(self):
+        stale = ApprovalApplication.objects.get(pk=self.application.pk)
+        ApprovalApplication.objects.filter(pk=self.application.pk).update(notes='Checked by phone')
+        stale.transition_to('submitted')
+        self.application.refresh_from_db()
+        self.assertEqual((self.application.status, self.application.notes), ('submitted', 'Checked by phone'))
+        self.assertEqual(self.application.updated_at, stale.updated_at)
+
+    def test_concurrent_transitions_from_same_status(self):
+        self.application.transition_to('submitted')
+        first = ApprovalApplication.objects.get(pk=self.application.pk)
+        second = ApprovalApplication.objects.get(pk=self.application.pk)
+        first.transition_to('approved')
+        with self.assertRaises(ValidationError) as cm:
+            second.transition_to('rejected')
+        self.assertEqual(cm.exception.code, 'stale_transition')
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, 'approved')
+        self.assertEqual(list(self.application.status_changes.values_list('to_status', flat=True)),
+                         ['submitted', 'approved'])
+
+
+class ProcessingStatsTests(TestCase):
+
+    def setUp(self):
+        self.business = create_business('owner', 'REG-1')
+
+    def decide(self, number, status, counted=False):
+        application = create_application(self.business, number, submission_date=timezone.now() - timedelta(days=2))
+        return ApplicationStatusChange.objects.create(
+            application=application, from_status='submitted', to_status=status, stats_counted=counted)
+
+    def test_decisions_counted_once(self):
+        first = self.decide(1, 'approved')
+        self.assertEqual(update_processing_stats(), 1)
+        self.assertEqual(update_processing_stats(), 0)
+        stats = ApprovalTypeStats.objects.get(approval_type_id=first.application.approval_type_id)
+        self.assertEqual((stats.decided_count, stats.approved_count), (1, 1))
+        self.assertAlmostEqual(stats.median_days, 2, delta=0.05)
+
+    def test_late_commit_with_lower_id_is_counted(self):
+        # A decision whose transaction committed after a higher id was
+        # already processed.
+        late = self.decide(1, 'rejected')
+        self.decide(2, 'approved', counted=True)
+        self.assertEqual(update_processing_stats(), 1)
+        stats = ApprovalTypeStats.objects.get(approval_type_id=late.application.approval_type_id)
+        self.assertEqual(stats.rejected_count, 1)
+
+    def test_folds_merge_into_existing_rows(self):
+        approval_type_id = self.decide(1, 'approved').application.approval_type_id
+        update_processing_stats()
+        apply_decisions([(approval_type_id, 'rejected', 4.0), (approval_type_id, 'approved', None)])
+        stats = ApprovalTypeStats.objects.get(approval_type_id=approval_type_id)
+        self.assertEqual((stats.decided_count, stats.approved_count, stats.rejected_count), (3, 2, 1))
+        self.assertEqual(stats.sketch['count'], 2)
+        self.assertAlmostEqual(QuantileSketch(state=stats.sketch).quantile(1), 4, delta=0.1)
+
+    def test_stats_rows_are_locked(self):
+        approval_type_id = self.decide(1, 'approved').application.approval_type_id
+        with mock.patch.object(ApprovalTypeStats.objects, 'select_for_update',
+                               wraps=ApprovalTypeStats.objects.select_for_update) as locked:
+            update_processing_stats()
+        locked.assert_called_once_with()
+        self.assertTrue(ApprovalTypeStats.objects.filter(approval_type_id=approval_type_id).exists())
+
+
+@override_settings(API_RATE_LIMIT='2/m')
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        ratelimit.local_buckets.buckets.clear()
+
+    def get(self, now, ip='10.0.0.1', api_key=None):
+        headers = {'X-API-Key': api_key} if api_key else {}
+        with mock.patch('business_portal.ratelimit.time') as clock:
+            clock.time.return_value = now
+            return self.client.get(reverse('api_application_status', args=['APP-404']),
+                                   REMOTE_ADDR=ip, headers=headers)
+
+    def test_refills_continuously_with_retry_after(self):
+        self.assertEqual(self.get(1000).status_code, 404)
+        self.assertEqual(self.get(1000).status_code, 404)
+        response = self.get(1010)
+        self.assertEqual(response.status_code, 429)
+        # A third of a token back after 10s; a full one takes 30s.
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(self.get(1030).status_code, 404)
+        self.assertEqual(self.get(1031).status_code, 429)
+        # An idle bucket refills to capacity, never beyond.
+        self.assertEqual([self.get(2000).status_code for _ in range(3)], [404, 404, 429])
+
+    def test_limits_per_ip(self):
+        for _ in range(2):
+            self.get(1000)
+        self.assertEqual(self.get(1000).status_code, 429)
+        self.assertEqual(self.get(1000, ip='10.0.0.2').status_code, 404)
+
+    def test_api_key_is_limited_across_ips(self):
+        self.assertEqual(self.get(1000, ip='10.0.0.1', api_key='partner').status_code, 404)
+        self.assertEqual(self.get(1000, ip='10.0.0.2', api_key='partner').status_code, 404)
+        self.assertEqual(self.get(1000, ip='10.0.0.3', api_key='partner').status_code, 429)
+        self.assertEqual(self.get(1000, ip='10.0.0.3', api_key='other').status_code, 404)
+
+    def test_no_database_work(self):
+        bucket = ratelimit.TokenBucket('2/m')
+        with self.assertNumQueries(0):
+            self.assertEqual(bucket.consume('ip:10.0.0.9', now=1000), 0)
+
+
+@override_settings(RECEIPTS_ASYNC=False)
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.application = create_application(create_business('owner', 'REG-1'), 1)
+        self.application.transition_to('submitted')
+        self.application.transition_to('approved')
+
+    def stats(self):
+        return ApprovalTypeStats.objects.get(approval_type_id=self.application.approval_type_id)
+
+    def test_keeps_history_and_counts_pending_decisions(self):
+        self.assertEqual(archive_batch([self.application.id]), 1)
+        archived = ArchivedApplication.objects.get(pk=self.application.id)
+        self.assertEqual([(c['from'], c['to']) for c in archived.status_history],
+                         [('draft', 'submitted'), ('submitted', 'approved')])
+        self.assertEqual(self.stats().approved_count, 1)
+        self.assertEqual(update_processing_stats(), 0)
+        self.assertEqual(self.stats().approved_count, 1)
+
+    def test_rebuild_includes_archive(self):
+        update_processing_stats()
+        archive_batch([self.application.id])
+        rebuild_processing_stats()
+        self.assertEqual((self.stats().decided_count, self.stats().approved_count), (1, 1))
+
+    def test_archived_numbers_are_not_reissued(self):
+        archive_batch([self.application.id])
+        number = self.application.application_number
+        with mock.patch('business_portal.views.random.choices', side_effect=[list(number[4:]), list('NEW00001')]):
+            self.assertEqual(generate_application_number(), 'APP-NEW00001')
+
+
+@override_settings(METRICS_TOKEN='scrape-secret', METRICS_DIR=None)
+class MetricsAccessTests(TestCase):
+
+    def test_loopback_is_not_trusted(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_token_or_staff(self):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertContains(response, 'eodb_request_duration_seconds')
+        self.client.force_login(User.objects.create_user('ops', is_staff=True))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class MetricsAggregateTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(METRICS_DIR=self.directory))
+
+    def write(self, pid, queries):
+        with open(os.path.join(self.directory, f'metrics_{pid}.json'), 'w') as fh:
+            json.dump({'eodb_db_queries_total': [[['home'], queries]],
+                       'eodb_workers_busy': [[[], 1]]}, fh)
+
+    def total(self, name, key):
+        with mock.patch.object(metrics, 'snapshot', return_value={}), \
+                mock.patch.object(metrics, 'flush'):
+            samples = dict((tuple(k), v) for k, v in metrics.collect().get(name, []))
+        return samples.get(key)
+
+    def test_exited_workers_keep_counting(self):
+        self.write(101, 5)
+        self.write(102, 7)
+        self.assertEqual(self.total('eodb_db_queries_total', ('home',)), 12)
+        busy = metrics.Metric('eodb_workers_busy', 'Test gauge')
+        busy.kind = 'gauge'
+        self.addCleanup(metrics.registry.pop, 'eodb_workers_busy')
+        metrics.retire_worker(self.directory, 101)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'metrics_101.json')))
+        self.assertEqual(self.total('eodb_db_queries_total', ('home',)), 12)
+        self.assertEqual(self.total('eodb_workers_busy', ()), 1)
+        metrics.retire_worker(self.directory, 102)
+        self.assertEqual(self.total('eodb_db_queries_total', ('home',)), 12)
+        self.assertIsNone(self.total('eodb_workers_busy', ()))
+
+    def test_retired_worker_is_not_counted_twice(self):
+        self.write(101, 5)
+        metrics.retire_worker(self.directory, 101)
+        # As if the master had not removed the file yet.
+        self.write(101, 5)
+        self.assertEqual(self.total('eodb_db_queries_total', ('home',)), 5)
+
+
+@override_settings(RECEIPTS_ASYNC=False)
+class ReceiptFreshnessTests(TestCase):
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.business = create_business('owner', 'REG-1')
+        self.application = create_application(self.business, 1, status='submitted')
+        self.client.force_login(self.business.user)
+
+    def receipt(self):
+        response = self.client.get(reverse('application_receipt', args=[self.application.id]))
+        return b''.join(response.streaming_content)
+
+    def upload(self, name, content):
+        # Receipts are rendered on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('upload_document', args=[self.application.id]), {
+                'document_type': 'pan', 'document': SimpleUploadedFile(name, content),
+            })
+        return ApplicationDocument.objects.latest('id')
+
+    def test_pdf_upload_shows_verified(self):
+        self.upload('pan.pdf', b'%PDF-1.4')
+        self.assertIn(b'(Verified', self.receipt())
+
+    def test_signature_refreshes_receipt(self):
+        document = self.upload('pan.png', PNG)
+        self.assertIn(b'(Pending', self.receipt())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_signature', args=[document.id]), {
+                'signature_image': SimpleUploadedFile('signature.png', PNG, content_type='image/png'),
+            })
+        self.assertIn(b'(Verified', self.receipt())
+
+
+@override_settings(RECEIPTS_ASYNC=False)
+class SigningTests(TestCase):
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.business = create_business('owner', 'REG-1')
+        application = create_application(self.business, 1)
+        self.document = ApplicationDocument.objects.create(
+            application=application, document_type='pan', document=SimpleUploadedFile('pan.pdf', b'%PDF-1.4 pan'))
+        self.client.force_login(self.business.user)
+
+    def sign(self):
+        return self.client.post(reverse('add_signature', args=[self.document.id]), {
+            'signature_image': SimpleUploadedFile('signature.png', PNG, content_type='image/png'),
+        })
+
+    def verify_all(self):
+        output, errors = io.StringIO(), io.StringIO()
+        call_command('verify_signatures', workers=1, stdout=output, stderr=errors)
+        return output.getvalue(), errors.getvalue()
+
+    def test_sign_then_verify(self):
+        self.assertRedirects(self.sign(), reverse('application_details', args=[self.document.application_id]))
+        signature = DigitalSignature.objects.get()
+        self.assertTrue(signing.verify(self.document.document.path, self.document.id, self.business.user.id,
+                                       signature.document_sha256, signature.signature))
+        output, errors = self.verify_all()
+        self.assertIn('Verified 1 signatures, 0 changed validity', output)
+        signature.refresh_from_db()
+        self.assertTrue(signature.is_valid)
+        self.assertIsNotNone(signature.verified_at)
+
+    def test_tampered_document_is_invalid(self):
+        self.sign()
+        with open(self.document.document.path, 'ab') as fh:
+            fh.write(b' edited')
+        output, errors = self.verify_all()
+        self.assertIn('1 changed validity', output)
+        self.assertFalse(DigitalSignature.objects.get().is_valid)
+
+    def test_missing_or_unreadable_document(self):
+        self.sign()
+        with mock.patch('business_portal.signing.hash_file', side_effect=PermissionError):
+            output, errors = self.verify_all()
+        self.assertIn('1 could not be read', output)
+        self.assertIn(f'signature {DigitalSignature.objects.get().id}: document could not be read', errors)
+        self.assertTrue(DigitalSignature.objects.get().is_valid)
+        os.remove(self.document.document.path)
+        self.verify_all()
+        self.assertFalse(DigitalSignature.objects.get().is_valid)
+
+    def test_signing_a_missing_file_shows_an_error(self):
+        os.remove(self.document.document.path)
+        response = self.sign()
+        self.assertContains(response, 'The document file could not be read')
+        self.assertFalse(DigitalSignature.objects.exists())
+
+
+@override_settings(RECEIPTS_ASYNC=False)
+class CleanMediaTests(TestCase):
+
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.business = create_business('owner', 'REG-1')
+        self.application = create_application(self.business, 1)
+        self.month_ago = time.time() - 30 * 86400
+
+    def png(self):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, format='PNG', compress_level=0)
+        return buffer.getvalue()
+
+    def document(self, name, content):
+        document = ApplicationDocument.objects.create(
+            application=self.application, document_type='pan', document=SimpleUploadedFile(name, content))
+        self.age(document.document.path)
+        return document
+
+    def age(self, path):
+        os.utime(path, (self.month_ago, self.month_ago))
+        return path
+
+    def orphan(self, name, old=True):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(b'orphan')
+        return self.age(path) if old else path
+
+    def run_command(self, *args):
+        output = io.StringIO()
+        call_command('clean_media', *args, '--workers', '1', stdout=output, stderr=io.StringIO())
+        return output.getvalue()
+
+    def test_removes_old_orphans_only(self):
+        kept = self.document('kept.pdf', b'%PDF-1.4')
+        old = self.orphan('application_documents/old.pdf')
+        young = self.orphan('application_documents/new.pdf', old=False)
+        self.assertIn('Removed 1 orphans', self.run_command())
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(young))
+        self.assertTrue(os.path.exists(kept.document.path))
+
+    def test_dry_run_changes_nothing(self):
+        document = self.document('scan.png', self.png())
+        size = os.path.getsize(document.document.path)
+        old = self.orphan('application_documents/old.pdf')
+        output = self.run_command('--dry-run', '--compress', '--cold-days', '7')
+        self.assertIn('Would remove 1 orphans', output)
+        self.assertIn('orphan: application_documents/old.pdf', output)
+        self.assertIn('Would recompress 1 cold files', output)
+        self.assertTrue(os.path.exists(old))
+        self.assertEqual(os.path.getsize(document.document.path), size)
+
+    def test_signed_documents_are_not_recompressed(self):
+        unsigned = self.document('unsigned.png', self.png())
+        signed = self.document('signed.png', self.png())
+        signature = DigitalSignature.objects.create(
+            user=self.business.user, document=signed,
+            signature_image=SimpleUploadedFile('signature.png', PNG), document_sha256='0' * 64)
+        self.age(signature.signature_image.path)
+        sizes = {d.id: os.path.getsize(d.document.path) for d in (unsigned, signed)}
+        # The unsigned document and the signature image itself.
+        self.assertIn('Recompressed 2 cold files (0 failed)', self.run_command('--compress', '--cold-days', '7'))
+        self.assertLess(os.path.getsize(unsigned.document.path), sizes[unsigned.id])
+        self.assertEqual(os.path.getsize(signed.document.path), sizes[signed.id])
+        # The new bytes get a new mtime, so If-Modified-Since sees them.
+        self.assertGreater(os.path.getmtime(unsigned.document.path), self.month_ago)
+        self.assertIn('Recompressed 0 cold files', self.run_command('--compress', '--cold-days', '7'))
+
+
+class ReadyTests(TestCase):
+
+    def setUp(self):
+        self.enterContext(mock.patch.dict(warmup.state, {'ready': False, 'timings': {}, 'failed': []}))
+
+    def test_warms_up_on_first_call(self):
+        response = self.client.get(reverse('ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['warmup_ms']), {'imports', 'templates', 'urls', 'database', 'caches'})
+        self.assertTrue(warmup.state['ready'])
+
+    def test_failed_step_is_not_ready(self):
+        with mock.patch.object(warmup, 'compile_templates', side_effect=OSError('templates missing')):
+            with self.assertLogs('business_portal.warmup', 'ERROR'):
+                response = self.client.get(reverse('ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'warming up', 'failed': ['templates']})
+        self.assertFalse(warmup.state['ready'])
+        # Retried, and ready once the step succeeds.
+        self.assertEqual(self.client.get(reverse('ready')).status_code, 200)
+
+    def test_database_down(self):
+        warmup.warm_up()
+        with mock.patch.object(warmup, 'open_connections', side_effect=OSError):
+            self.assertEqual(self.client.get(reverse('ready')).status_code, 503)
+
+
+@override_settings(BULK_UPLOAD_MAX_FILES=3, BULK_UPLOAD_MAX_FILE_SIZE=1024 * 1024,
+                   BULK_UPLOAD_MAX_TOTAL_SIZE=2 * 1024 * 1024, BULK_UPLOAD_MAX_RATIO=100)
+class BulkUploadTests(TestCase):
+
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, RECEIPTS_ASYNC=False))
+        self.application = create_application(create_business('owner', 'REG-1'), 1)
+
+    def archive(self, members, compression=zipfile.ZIP_DEFLATED):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression) as archive:
+            for name, data in members:
+                archive.writestr(name, data)
+        return buffer.getvalue()
+
+    def upload(self, *files):
+        return bulk_upload(self.application, [SimpleUploadedFile(name, data) for name, data in files], 'pan')
+
+    def test_accepts_files_and_archives(self):
+        documents, rejected = self.upload(
+            ('a.pdf', b'%PDF-1.4'),
+            ('more.zip', self.archive([('b.pdf', b'%PDF-1.4'), ('notes.exe', b'MZ')])),
+        )
+        self.assertEqual(len(documents), 2)
+        self.assertEqual(rejected, [('notes.exe', '.exe files are not accepted')])
+        self.assertEqual(ApplicationDocument.objects.count(), 2)
+
+    def test_file_count_limit(self):
+        data = self.archive([(f'{i}.pdf', b'%PDF-1.4') for i in range(4)])
+        with self.assertRaisesMessage(UploadLimitExceeded, 'the archive has 4 files, the limit is 3'):
+            self.upload(('many.zip', data))
+        self.assertFalse(ApplicationDocument.objects.exists())
+
+    def test_size_limits(self):
+        big = os.urandom(1024 * 1024 + 1)
+        documents, rejected = self.upload(('big.pdf', big), ('big.zip', self.archive([('big.pdf', big)])))
+        self.assertEqual([reason for name, reason in rejected], ['larger than 1 MB'] * 2)
+        chunk = os.urandom(900 * 1024)
+        with self.assertRaises(UploadLimitExceeded):
+            self.upload(('1.pdf', chunk), ('2.pdf', chunk), ('3.pdf', chunk))
+        self.assertFalse(ApplicationDocument.objects.exists())
+
+    def test_compression_ratio(self):
+        documents, rejected = self.upload(('bomb.zip', self.archive([('zeros.pdf', bytes(512 * 1024))])))
+        self.assertEqual(rejected, [('zeros.pdf', 'suspicious compression ratio')])
+
+    def test_corrupt_archives(self):
+        good = ('ok.pdf', b'%PDF-1.4 ' + os.urandom(200))
+        stored = bytearray(self.archive([('bad-crc.pdf', b'%PDF-1.4 ' + os.urandom(200)), good], zipfile.ZIP_STORED))
+        stored[stored.index(b'%PDF') + 20] ^= 0xFF
+        deflated = bytearray(self.archive([('bad-stream.pdf', os.urandom(2000))]))
+        start = deflated.index(b'bad-stream.pdf') + len('bad-stream.pdf')
+        deflated[start:start + 50] = bytes(50)
+        unsupported = bytearray(self.archive([('odd.pdf', b'%PDF-1.4')]))
+        central = unsupported.index(b'PK\x01\x02')
+        unsupported[central + 10:central + 12] = (99).to_bytes(2, 'little')
+
+        documents, rejected = self.upload(
+            ('stored.zip', bytes(stored)), ('deflated.zip', bytes(deflated)),
+            ('unsupported.zip', bytes(unsupported)), ('junk.zip', b'not a zip'),
+        )
+        self.assertEqual([d.document.name.rsplit('/', 1)[-1] for d in documents], ['ok.pdf'])
+        self.assertEqual([name for name, reason in rejected], ['bad-crc.pdf', 'bad-stream.pdf', 'odd.pdf', 'junk.zip'])
+
+
+@override_settings(RECEIPTS_ASYNC=False, REVIEW_LEASE_SECONDS=600)
+class ReviewQueueTests(TestCase):
+
+    def setUp(self):
+        business = create_business('owner', 'REG-1')
+        self.applications = []
+        for number in range(4):
+            application = create_application(business, number)
+            application.transition_to('submitted')
+            self.applications.append(application)
+        self.alice = User.objects.create_user('alice', is_staff=True)
+        self.bob = User.objects.create_user('bob', is_staff=True)
+
+    def test_claims_without_overlap(self):
+        first = review_queue.claim(self.alice, count=3)
+        second = review_queue.claim(self.bob, count=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(set(first) | set(second), set(self.applications))
+        self.assertEqual(review_queue.claim(self.bob), [])
+        self.assertEqual(set(review_queue.held_by(self.alice)), set(first))
+
+    def test_concurrent_claim_of_the_same_rows(self):
+        # Both reviewers read the same candidates; only the first UPDATE
+        # may lease them.
+        now = timezone.now()
+        ids = [a.id for a in self.applications[:2]]
+        self.assertEqual(review_queue._lease(self.alice, uuid.uuid4(), now, ids), 2)
+        self.assertEqual(review_queue._lease(self.bob, uuid.uuid4(), now, ids), 0)
+        self.assertFalse(review_queue.held_by(self.bob).exists())
+
+    def test_expired_lease_returns_to_queue(self):
+        [application] = review_queue.claim(self.alice)
+        later = timezone.now() + timedelta(seconds=601)
+        self.assertFalse(review_queue.held_by(self.alice, later).exists())
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            reclaimed = review_queue.claim(self.bob, count=4)
+        self.assertIn(application, reclaimed)
+        self.assertEqual({a.claimed_by for a in reclaimed}, {self.bob})
+
+    def test_decide_after_losing_the_lease(self):
+        [application] = review_queue.claim(self.alice)
+        later = timezone.now() + timedelta(seconds=601)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            review_queue.claim(self.bob, count=4)
+            with self.assertRaises(review_queue.LeaseLost):
+                review_queue.decide(application.id, self.alice, 'approved')
+            decided = review_queue.decide(application.id, self.bob, 'approved')
+        self.assertEqual(decided.status, 'approved')
+        self.assertIsNone(decided.lease_token)
+
+    def test_decisions_keep_applications_in_the_queue_workflow(self):
+        [application] = review_queue.claim(self.alice)
+        with self.assertRaises(ValidationError):
+            review_queue.decide(application.id, self.alice, 'under_review')
+        application.refresh_from_db()
+        self.assertEqual((application.status, application.claimed_by), ('submitted', self.alice))
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('review_queue'))
+        self.assertEqual([value for value, label in response.context['decisions']],
+                         ['approved', 'rejected', 'additional_info_required'])
+
+
+@override_settings(RECEIPTS_ASYNC=False, WEBHOOK_BATCH_SIZE=2, WEBHOOK_CONCURRENCY=2, WEBHOOK_TIMEOUT=10)
+class WebhookDispatchTests(TestCase):
+
+    def setUp(self):
+        business = create_business('owner', 'REG-1')
+        WebhookSubscription.objects.create(url='https://hooks.example.com/eodb', business=business)
+        for number in range(3):
+            create_application(business, number).transition_to('submitted')
+
+    def send(self, result=None, during=None):
+        async def sent(batches):
+            return [result] * len(batches)
+
+        def send_batches(batches, concurrency, timeout):
+            if during:
+                during()
+            return sent(batches)
+        return mock.patch('business_portal.webhooks.send_batches', send_batches)
+
+    def test_lease_covers_the_whole_round(self):
+        # 5 deliveries for one subscriber: 3 batches, 2 waves of 3 timeouts.
+        self.assertEqual(webhooks.round_lease([1] * 5), timedelta(seconds=70))
+        self.assertEqual(webhooks.round_lease([1, 2]), timedelta(seconds=40))
+
+    def test_claimed_deliveries_are_skipped(self):
+        token, deliveries = webhooks.claim_due(10)
+        self.assertEqual(len(deliveries), 3)
+        self.assertEqual(webhooks.claim_due(10), (None, []))
+        with self.send():
+            self.assertEqual(webhooks.dispatch_pending(), (0, 0))
+        self.assertFalse(WebhookDelivery.objects.exclude(claim_token=token).exists())
+
+    def test_delivers_and_clears_the_claim(self):
+        with self.send():
+            self.assertEqual(webhooks.dispatch_pending(), (3, 0))
+        self.assertEqual(set(WebhookDelivery.objects.values_list('status', 'attempts', 'claim_token')),
+                         {('delivered', 1, None)})
+
+    def test_round_that_lost_its_claim_writes_nothing(self):
+        def reclaimed():
+            # The lease ran out and another dispatcher took the deliveries.
+            WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+            self.second_token, _ = webhooks.claim_due(10)
+
+        with self.send('HTTP 500', during=reclaimed):
+            webhooks.dispatch_pending()
+        self.assertEqual(set(WebhookDelivery.objects.values_list('status', 'attempts', 'claim_token')),
+                         {('pending', 0, self.second_token)})
+
+
+class ExcerptTests(TestCase):
+    # Full text columns that only detail pages read.
+    FULL_TEXT = {
+        'business_portal_governmentscheme': ('description', 'eligibility', 'benefits', 'application_process'),
+        'business_portal_approvaltype': ('description', 'required_documents'),
+        'business_portal_newsarticle': ('content',),
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.long_text = 'word ' * 100
+        self.scheme = GovernmentScheme.objects.create(
+            name='Seed Fund', description=self.long_text, eligibility='Startups', benefits='Funding',
+            application_process='Online', website_link='https://example.com',
+            start_date=timezone.localdate() - timedelta(days=1),
+        )
+        ApprovalType.objects.create(
+            name='Trade Licence', department='Trade', description=self.long_text,
+            processing_time='7 days', fees=100, required_documents='PAN',
+        )
+        NewsArticle.objects.create(title='Launch', content=self.long_text, publish_date=timezone.localdate(), source='Gazette')
+        self.client.force_login(User.objects.create_user('owner', password='secret'))
+
+    def test_list_pages_defer_full_text(self):
+        for url_name in ('home', 'government_schemes', 'news', 'approval_types'):
+            with self.subTest(url_name), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(url_name)).status_code, 200)
+            sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+            for table, columns in self.FULL_TEXT.items():
+                for column in columns:
+                    self.assertNotIn(f'"{table}"."{column}"', sql, url_name)
+
+    def test_excerpts_follow_saves(self):
+        self.assertEqual(self.scheme.excerpt, Truncator(self.long_text).chars(150))
+        self.scheme.description = 'Grants for new firms'
+        self.scheme.benefits = 'Seed funding'
+        self.scheme.save(update_fields=['description', 'benefits'])
+        self.scheme.refresh_from_db()
+        self.assertEqual((self.scheme.excerpt, self.scheme.benefits_excerpt), ('Grants for new firms', 'Seed funding'))
+
+
+class SchemeFacetTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.scheme = GovernmentScheme.objects.create(
+            name='Seed Fund', description='Grants', eligibility='Startups', benefits='Funding',
+            application_process='Online', website_link='https://example.com', start_date=self.today - timedelta(days=90),
+        )
+        self.user = User.objects.create_user('owner', password='secret')
+
+    def availability(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('government_schemes'))
+        options = response.context['facets']['window']['options']
+        return {option['value']: option['count'] for option in options}, list(response.context['schemes'])
+
+    def test_version_from_another_process_expires(self):
+        self.assertEqual(self.availability()[0]['open'], 1)
+        # A bulk change made by another process, whose invalidation only
+        # bumped its own local version.
+        GovernmentScheme.objects.update(start_date=self.today + timedelta(days=1))
+        self.assertEqual(self.availability()[0]['open'], 1)
+        self.assertEqual(SCHEME_FACETS.version_cache(), (cache, VERSION_TTL))
+        cache.delete('facets:schemes:version')  # VERSION_TTL passed
+        self.assertEqual(self.availability()[0], {'open': 0, 'closing_soon': 0, 'upcoming': 1})
+
+    def test_cached_counts_cost_no_queries(self):
+        catalog = GovernmentScheme.objects.filter(is_active=True)
+        SCHEME_FACETS.counts(catalog, {})
+        with self.assertNumQueries(0):
+            SCHEME_FACETS.counts(catalog, {})
+            SCHEME_FACETS.counts(catalog, {'window': 'open'})
+
+    def test_ended_schemes_are_left_out_before_expiry(self):
+        GovernmentScheme.objects.filter(pk=self.scheme.pk).update(end_date=self.today - timedelta(days=1))
+        SCHEME_FACETS.invalidate()
+        counts, schemes = self.availability()
+        self.assertEqual(counts, {'open': 0, 'closing_soon': 0, 'upcoming': 0})
+        self.assertEqual(schemes, [])
+        self.assertEqual(expire_content(self.today), (1, 0))
+
+
+class ProfileViewsTests(TestCase):
+
+    def flags(self, plan, sql='SELECT * FROM t WHERE a = %s', max_per_request=1, duplicates=0):
+        return profile_views.Command().flags({
+            'sql': sql, 'plan': plan, 'max_per_request': max_per_request, 'duplicates': duplicates})
+
+    def test_flags(self):
+        self.assertEqual(self.flags(['SCAN business_portal_governmentscheme USING INDEX scheme_live_created_idx']), [])
+        self.assertEqual(self.flags(['SCAN auth_user USING COVERING INDEX auth_user_username']), [])
+        self.assertEqual(self.flags(['SCAN business_portal_governmentscheme']),
+                         ['full scan of business_portal_governmentscheme with a WHERE clause: missing index?'])
+        self.assertEqual(self.flags(['SCAN news'], sql='SELECT * FROM news'), ['full scan of news'])
+        self.assertEqual(self.flags(['SEARCH t USING INDEX t_a (a=?)', 'USE TEMP B-TREE FOR ORDER BY'],
+                                    max_per_request=3, duplicates=2),
+                         ['sort without an index (ORDER BY)', 'runs up to 3x per request: N+1?',
+                          '2 identical repeats within a request'])
+
+    def test_report_leaves_out_transaction_control(self):
+        output = io.StringIO()
+        with mock.patch.object(profile_views, 'setup_test_environment'), \
+                mock.patch.object(profile_views, 'teardown_test_environment'):
+            call_command('profile_views', view=['home'], repeat=2, format='json', stdout=output)
+        report = json.loads(output.getvalue())
+        self.assertEqual(report['requests'][0]['status'], 200)
+        self.assertTrue(report['statements'])
+        for statement in report['statements']:
+            self.assertNotRegex(statement['sql'], r'^(SAVEPOINT|RELEASE|ROLLBACK)')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ComplianceDigestTests(TestCase):
+
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        self.owners = [create_business(f'owner{i}', f'REG-{i}') for i in range(3)]
+        for business in self.owners:
+            for offset in (-2, 3):
+                Compliance.objects.create(business=business, title=f'GST return {offset}', description='File',
+                                          due_date=self.today + timedelta(days=offset))
+        Compliance.objects.create(business=self.owners[0], title='Later', description='File',
+                                  due_date=self.today + timedelta(days=30))
+
+    def send(self, **kwargs):
+        return send_compliance_digests(pending_reminders(self.today), today=self.today, **kwargs)
+
+    def test_one_digest_per_user(self):
+        self.assertEqual(self.send(batch_size=2), (3, 6))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         ['owner0@example.com', 'owner1@example.com', 'owner2@example.com'])
+        body = mail.outbox[0].body
+        self.assertIn('overdue:\n  - GST return -2', body)
+        self.assertIn('next 7 days:\n  - GST return 3', body)
+        self.assertNotIn('Later', body)
+        self.assertEqual(Compliance.objects.filter(reminder_sent=False).count(), 1)
+        self.assertEqual(self.send(), (0, 0))
+
+    def test_failed_digest_is_not_flagged(self):
+        User.objects.filter(username='owner2').update(email='')
+        send = mail.get_connection().__class__.send_messages
+
+        def refuse_owner1(connection, messages):
+            return 0 if messages[0].to == ['owner1@example.com'] else send(connection, messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', refuse_owner1):
+            self.assertEqual(self.send(), (1, 4))
+        unflagged = Compliance.objects.filter(reminder_sent=False, due_date__lte=self.today + timedelta(days=7))
+        self.assertEqual({c.business.user.username for c in unflagged}, {'owner1'})
+        self.assertEqual(self.send(), (1, 2))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', ONBOARDING_HASH_WORKERS=1)
+class OnboardingTests(TestCase):
+
+    def member(self, i, **extra):
+        row = {
+            'username': f'member{i}', 'email': f'member{i}@example.com', 'business_name': f'Member {i}',
+            'business_type': 'retail', 'registration_number': f'REG-{i}', 'address': 'Delhi',
+            'contact_person': 'Asha', 'contact_number': '9999999999', 'date_established': '2020-01-01',
+        }
+        row.update(extra)
+        return row
+
+    def test_batch_costs_constant_queries(self):
+        for size in (5, 40):
+            rows = [self.member(f'{size}-{i}') for i in range(size)]
+            # Uniqueness lookup, savepoint, two INSERTs, release.
+            with self.assertNumQueries(5):
+                summary = onboard(rows, 'https://portal.example.com')
+            self.assertEqual(summary['created'], size)
+        self.assertEqual(BusinessProfile.objects.filter(user__username='member40-3').count(), 1)
+
+    def test_rejects_taken_and_duplicate_values(self):
+        onboard([self.member(1)], 'https://portal.example.com')
+        summary = onboard(
+            [self.member(1), self.member(2), self.member(3, registration_number='REG-2'), self.member(4, business_type='x')],
+            'https://portal.example.com',
+        )
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(sorted(summary['errors']), ['1', '3', '4'])
+        self.assertIn('registration_number: REG-2 appears more than once', summary['errors']['3'])
+
+    def test_passwords_and_set_password_links(self):
+        summary = onboard([self.member(1, password='s3cret-pass'), self.member(2)], 'https://portal.example.com')
+        self.assertTrue(User.objects.get(username='member1').check_password('s3cret-pass'))
+        self.assertFalse(User.objects.get(username='member2').has_usable_password())
+        self.assertEqual(summary['links_sent'], 1)
+        self.assertEqual(mail.outbox[0].to, ['member2@example.com'])
+        self.assertIn('https://portal.example.com/accounts/reset/', mail.outbox[0].body)
+
+    def test_endpoint_is_staff_only(self):
+        user = User.objects.create_user('clerk', password='secret')
+        self.client.force_login(user)
+        response = self.client.post(reverse('bulk_onboard'), '[]', content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        user.is_staff = True
+        user.save()
+        response = self.client.post(reverse('bulk_onboard'), {
+            'file': SimpleUploadedFile('members.csv', (
+                'username,email,business_name,business_type,registration_number,address,'
+                'contact_person,contact_number,date_established\n'
+                'csvmember,csv@example.com,CSV Co,retail,REG-CSV,Delhi,Asha,9999999999,2020-01-01\n'
+            ).encode()),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+
+    def test_passwords_are_validated(self):
+        summary = onboard([self.member(1, password='password'), self.member(2, password='member2!!'),
+                           self.member(3, password='s3cret-pass')], 'https://portal.example.com')
+        self.assertEqual(summary['created'], 1)
+        self.assertIn('password: This password is too common.', summary['errors']['1'])
+        self.assertIn('password: The password is too similar to the username.', summary['errors']['2'])
+
+    def test_user_fields_are_validated(self):
+        summary = onboard([
+            self.member(1, username='u' * 200), self.member(2, first_name='A' * 300),
+            self.member(3, username='bad name'), self.member(4, email='not-an-email'),
+        ], 'https://portal.example.com')
+        self.assertEqual(summary['created'], 0)
+        self.assertEqual(summary['errors'], {
+            '1': ['username: Ensure this value has at most 150 characters (it has 200).'],
+            '2': ['first_name: Ensure this value has at most 150 characters (it has 300).'],
+            '3': ['username: Enter a valid username. This value may contain only letters, numbers, '
+                  'and @/./+/-/_ characters.'],
+            '4': ['email: Enter a valid email address.'],
+        })
+
+    def test_json_values_that_are_not_text(self):
+        rows = parse_members(json.dumps([
+            self.member(1, contact_number=9999999999, password=48213957),
+            self.member(2, address=['Delhi']),
+        ]))
+        summary = onboard(rows, 'https://portal.example.com')
+        self.assertEqual(summary['created'], 0)
+        self.assertEqual(summary['errors'], {'1': ['password: This password is entirely numeric.'],
+                                             '2': ['address: must be text']})
+        rows = parse_members(json.dumps([self.member(3, contact_number=9999999999)]))
+        self.assertEqual(onboard(rows, 'https://portal.example.com')['created'], 1)
+
+    @override_settings(ONBOARDING_HASH_WORKERS=None, ONBOARDING_WEB_MAX_PASSWORDS=2)
+    def test_endpoint_hashes_in_the_request_thread(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        url = reverse('bulk_onboard')
+        response = self.client.post(url, {'members': SimpleUploadedFile('members.csv', b'')})
+        self.assertEqual(response.status_code, 400)
+        members = [self.member(i, password='s3cret-pass') for i in range(3)]
+        response = self.client.post(url, json.dumps(members), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        with mock.patch('business_portal.onboarding.ProcessPoolExecutor', side_effect=AssertionError):
+            response = self.client.post(url, json.dumps(members[:2]), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username='member1').check_password('s3cret-pass'))
@@ -0,0 +1,191 @@
+import os
+import tempfile
+import zipfile
+import zlib
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import ApplicationDocument
+
+ALLOWED_EXTENSIONS = ('pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png')
+UPLOAD_TO = 'application_documents/'
+CHUNK_SIZE = 64 * 1024
+# Raised while opening or reading a damaged ZIP member: bad CRC or header,
+# broken deflate stream, truncated data, unsupported compression method.
+CORRUPT_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError)
+
+
+class UploadRejected(Exception):
+    pass
+
+
+class UploadLimitExceeded(UploadRejected):
+    """Breaks a limit for the upload as a whole rather than one file."""
+
+
+def limit(name, default):
+    return getattr(settings, name, default)
+
+
+class LimitedReader:
+    """
+    Wraps a file-like object and stops once more than max_bytes have been
+    read. Sizes declared in a ZIP header are not trusted; this counts what
+    actually comes out of the decompressor.
+    """
+
+    def __init__(self, fileobj, max_bytes, budget):
+        self.fileobj = fileobj
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = CHUNK_SIZE
+        try:
+            data = self.fileobj.read(size)
+        except CORRUPT_MEMBER_ERRORS:
+            raise UploadRejected('the archive entry is corrupt or uses an unsupported compression method')
+        self.read_bytes += len(data)
+        self.budget['remaining'] -= len(data)
+        if self.read_bytes > self.max_bytes:
+            raise UploadRejected(f'larger than {self.max_bytes // (1024 * 1024)} MB')
+        if self.budget['remaining'] < 0:
+            raise UploadLimitExceeded('the upload expands beyond the total size limit')
+        return data
+
+
+def spool(reader):
+    """
+    Copy one entry through its size limit into a temporary file, so an
+    oversized entry never reaches storage half written. Only the current
+    entry is ever held, in memory up to CHUNK_SIZE and on disk beyond.
+    """
+    tmp = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+    try:
+        while True:
+            data = reader.read(CHUNK_SIZE)
+            if not data:
+                break
+            tmp.write(data)
+    except Exception:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return tmp
+
+
+def check_name(name):
+    basename = os.path.basename(name.replace('\\', '/'))
+    if not basename or basename.startswith('.'):
+        raise UploadRejected('invalid file name')
+    extension = os.path.splitext(basename)[1][1:].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise UploadRejected(f'.{extension or "?"} files are not accepted')
+    return basename
+
+
+def iter_zip(upload, budget):
+    """
+    Yield (name, reader, error) for each member of an uploaded ZIP. Members are
+    decompressed lazily, one at a time, straight from the uploaded file.
+    """
+    max_files = limit('BULK_UPLOAD_MAX_FILES', 20)
+    max_size = limit('BULK_UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024)
+    max_ratio = limit('BULK_UPLOAD_MAX_RATIO', 100)
+    try:
+        archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipFile:
+        yield upload.name, None, 'not a valid ZIP archive'
+        return
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > max_files:
+            raise UploadLimitExceeded(f'the archive has {len(members)} files, the limit is {max_files}')
+        for info in members:
+            try:
+                name = check_name(info.filename)
+                if info.flag_bits & 0x1:
+                    raise UploadRejected('encrypted entries are not supported')
+                if info.file_size > max_size:
+                    raise UploadRejected(f'larger than {max_size // (1024 * 1024)} MB')
+                if info.compress_size and info.file_size / info.compress_size > max_ratio:
+                    raise UploadRejected('suspicious compression ratio')
+            except UploadRejected as exc:
+                yield info.filename, None, str(exc)
+                continue
+            try:
+                member = archive.open(info)
+            except CORRUPT_MEMBER_ERRORS:
+                yield info.filename, None, 'the archive entry is corrupt or uses an unsupported compression method'
+                continue
+            with member:
+                yield name, LimitedReader(member, max_size, budget), None
+
+
+def iter_uploads(files):
+    """Yield (name, reader, error) for plain uploads and ZIP members alike."""
+    max_size = limit('BULK_UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024)
+    budget = {'remaining': limit('BULK_UPLOAD_MAX_TOTAL_SIZE', 50 * 1024 * 1024)}
+    for upload in files:
+        if upload.name.lower().endswith('.zip'):
+            yield from iter_zip(upload, budget)
+            continue
+        try:
+            name = check_name(upload.name)
+            if upload.size > max_size:
+                raise UploadRejected(f'larger than {max_size // (1024 * 1024)} MB')
+        except UploadRejected as exc:
+            yield upload.name, None, str(exc)
+            continue
+        upload.seek(0)
+        yield name, LimitedReader(upload, max_size, budget), None
+
+
+def bulk_upload(application, files, document_type):
+    """
+    Store every acceptable file and create their ApplicationDocument rows
+    in one INSERT. Returns (documents, rejected) where rejected is a list
+    of (name, reason). Nothing is created if the upload as a whole breaks
+    a limit.
+    """
+    max_files = limit('BULK_UPLOAD_MAX_FILES', 20)
+    storage = ApplicationDocument._meta.get_field('document').storage
+    documents, rejected, stored = [], [], []
+    try:
+        for name, reader, error in iter_uploads(files):
+            if error:
+                rejected.append((name, error))
+                continue
+            if len(documents) >= max_files:
+                raise UploadLimitExceeded(f'at most {max_files} files can be uploaded at once')
+            try:
+                content = spool(reader)
+            except UploadLimitExceeded:
+                raise
+            except UploadRejected as exc:
+                rejected.append((name, str(exc)))
+                continue
+            with content:
+                saved = storage.save(UPLOAD_TO + name, File(content, name=name))
+            stored.append(saved)
+            is_pdf = saved.lower().endswith('.pdf')
+            documents.append(ApplicationDocument(
+                application=application,
+                document_type=document_type,
+                document=saved,
+                is_verified=is_pdf,
+                verification_notes='Automatically verified as PDF' if is_pdf else None,
+            ))
+        with transaction.atomic():
+            ApplicationDocument.objects.bulk_create(documents)
+            if documents:
+                application.save(update_fields=['updated_at'])
+    except Exception:
+        for name in stored:
+            storage.delete(name)
+        raise
+    return documents, rejected
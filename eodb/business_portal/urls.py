@@ -19,7 +19,10 @@ urlpatterns = [
     path('approvals/', views.approval_types, name='approval_types'),
     path('approvals/create/<int:type_id>/', views.create_application, name='create_application'),
     path('approvals/<int:application_id>/', views.application_details, name='application_details'),
+    path('approvals/<int:application_id>/receipt/', views.application_receipt, name='application_receipt'),
+    path('approvals/<int:application_id>/upload/bulk/', views.bulk_upload_documents, name='bulk_upload_documents'),
     path('approvals/<int:application_id>/upload/', views.upload_document, name='upload_document'),
+    path('document/<int:document_id>/file/', views.download_document, name='download_document'),
     path('document/<int:document_id>/sign/', views.add_signature, name='add_signature'),
     
     # Government Schemes
@@ -34,6 +37,15 @@ urlpatterns = [
     path('news/', views.news, name='news'),
     path('news/<int:news_id>/', views.news_detail, name='news_detail'),
     
+    # Review queue
+    path('review/', views.review_queue_view, name='review_queue'),
+    path('review/<int:application_id>/', views.review_decision, name='review_decision'),
+    
+    # Health
+    path('ready/', views.ready, name='ready'),
+    path('metrics', views.metrics_view, name='metrics'),
+
     # API
     path('api/status/<str:application_number>/', views.api_application_status, name='api_application_status'),
+    path('api/onboard/', views.bulk_onboard, name='bulk_onboard'),
 ]
\ No newline at end of file
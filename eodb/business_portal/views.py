@@ -3,21 +3,36 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from datetime import datetime, timedelta
+from django.views.decorators.http import require_POST, require_safe
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import datetime
 import random
 import string
 
 from .models import (
     BusinessProfile, GovernmentScheme, ApprovalType,
     ApprovalApplication, ApplicationDocument, Compliance,
-    NewsArticle, DigitalSignature
+    NewsArticle, DigitalSignature, ApplicationReceipt
 )
+from .archive import application_number_taken, get_application_by_number
+from .facets import APPROVAL_TYPE_FACETS, SCHEME_FACETS
+from .ratelimit import ratelimit
+from .receipts import is_fresh, schedule_receipt
+from .uploads import UploadLimitExceeded, bulk_upload
+from . import review_queue
+from .onboarding import OnboardingError, onboard, parse_members
+from .reminders import pending_reminders, send_compliance_digests
+from .serving import serve_protected_file
+from .signing import sign_document
+from . import metrics, warmup
 from .forms import (
     UserRegistrationForm, BusinessProfileForm,
     ApprovalApplicationForm, ApplicationDocumentForm,
-    ComplianceForm, DigitalSignatureForm
+    ComplianceForm, DigitalSignatureForm, BulkDocumentUploadForm
 )
 from django.contrib.auth.views import LoginView
 
@@ -26,8 +41,12 @@ class CustomLoginView(LoginView):
     redirect_authenticated_user = True
 
 def home(request):
-    schemes = GovernmentScheme.objects.filter(is_active=True).order_by('-created_at')[:3]
-    news = NewsArticle.objects.filter(is_active=True).order_by('-publish_date')[:3]
+    schemes = GovernmentScheme.objects.filter(is_active=True).only(
+        'id', 'name', 'end_date', 'excerpt'
+    ).order_by('-created_at')[:3]
+    news = NewsArticle.objects.filter(is_active=True).only(
+        'id', 'title', 'publish_date', 'excerpt', 'source'
+    ).order_by('-publish_date')[:3]
     return render(request, 'business_portal/home.html', {
         'schemes': schemes,
         'news': news
@@ -71,38 +90,36 @@ def dashboard(request):
     except BusinessProfile.DoesNotExist:
         return redirect('business_profile')
     
-    applications = ApprovalApplication.objects.filter(business=business).order_by('-created_at')[:5]
-    compliances = Compliance.objects.filter(business=business, is_completed=False).order_by('due_date')[:5]
-    
-    # Check for due compliances and send reminders
-    due_soon = Compliance.objects.filter(
-        business=business,
-        is_completed=False,
-        due_date__lte=datetime.now().date() + timedelta(days=7),
-        reminder_sent=False
+    applications = list(
+        ApprovalApplication.objects.filter(business=business)
+        .select_related('approval_type').order_by('-created_at')[:5]
     )
+    compliances = list(Compliance.objects.filter(business=business, is_completed=False).order_by('due_date')[:5])
     
-    for compliance in due_soon:
-        send_mail(
-            f'Compliance Reminder: {compliance.title}',
-            f'Your compliance "{compliance.title}" is due on {compliance.due_date}. Please complete it on time.',
-            settings.DEFAULT_FROM_EMAIL,
-            [request.user.email],
-            fail_silently=True,
-        )
-        compliance.reminder_sent = True
-        compliance.save()
+    # Check for due compliances and send a single digest reminder
+    due_soon = list(pending_reminders().filter(business=business))
+    if due_soon:
+        send_compliance_digests(due_soon)
     
     return render(request, 'business_portal/dashboard.html', {
         'business': business,
         'applications': applications,
         'compliances': compliances,
+        'today': datetime.now().date(),
     })
 
 @login_required
 def approval_types(request):
-    types = ApprovalType.objects.filter(is_active=True)
-    return render(request, 'business_portal/approval_types.html', {'approval_types': types})
+    catalog = ApprovalType.objects.filter(is_active=True)
+    selected = APPROVAL_TYPE_FACETS.parse(request.GET)
+    types = APPROVAL_TYPE_FACETS.filter(catalog, selected).defer(
+        'description', 'required_documents'
+    ).select_related('processing_stats')
+    return render(request, 'business_portal/approval_types.html', {
+        'approval_types': types,
+        'facets': APPROVAL_TYPE_FACETS.counts(catalog, selected),
+        'selected': selected,
+    })
 
 @login_required
 def create_application(request, type_id):
@@ -129,39 +146,55 @@ def create_application(request, type_id):
 
 def generate_application_number():
     prefix = "APP"
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    return f"{prefix}-{random_str}"
+    while True:
+        random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+        number = f"{prefix}-{random_str}"
+        # An archived number reissued here would shadow the archived
+        # application in get_application_by_number.
+        if not application_number_taken(number):
+            return number
 
 @login_required
 def application_details(request, application_id):
-    application = get_object_or_404(ApprovalApplication, pk=application_id, business__user=request.user)
-    documents = ApplicationDocument.objects.filter(application=application)
+    application = get_object_or_404(
+        ApprovalApplication.objects.select_related('business', 'approval_type__processing_stats'),
+        pk=application_id, business__user=request.user
+    )
+    documents = list(ApplicationDocument.objects.filter(application=application))
     
     if request.method == 'POST' and 'submit_application' in request.POST:
-        if documents.count() < 1:
+        if not application.can_transition('submitted'):
+            messages.error(request, 'This application has already been submitted.')
+        elif not documents:
             messages.error(request, 'Please upload at least one document before submitting.')
         else:
-            application.status = 'submitted'
-            application.submission_date = datetime.now()
-            application.save()
+            try:
+                application.transition_to('submitted', actor=request.user)
+            except ValidationError:
+                # A concurrent request submitted it first.
+                messages.error(request, 'This application has already been submitted.')
+                return redirect('application_details', application_id=application.id)
             
-            send_mail(
-                'Application Submitted Successfully',
-                f'Your application {application.application_number} for {application.approval_type.name} has been submitted successfully.',
-                settings.DEFAULT_FROM_EMAIL,
-                [request.user.email],
-                fail_silently=True,
-            )
+            with metrics.EMAIL_SEND.time(kind='application_submitted'):
+                send_mail(
+                    'Application Submitted Successfully',
+                    f'Your application {application.application_number} for {application.approval_type.name} has been submitted successfully.',
+                    settings.DEFAULT_FROM_EMAIL,
+                    [request.user.email],
+                    fail_silently=True,
+                )
             
             messages.success(request, 'Application submitted successfully!')
             return redirect('dashboard')
     
     document_form = ApplicationDocumentForm()
+    bulk_form = BulkDocumentUploadForm()
     
     return render(request, 'business_portal/application_details.html', {
         'application': application,
         'documents': documents,
         'document_form': document_form,
+        'bulk_form': bulk_form,
     })
 
 @login_required
@@ -173,21 +206,69 @@ def upload_document(request, application_id):
         if form.is_valid():
             document = form.save(commit=False)
             document.application = application
-            document.save()
-            
             if document.document.name.lower().endswith('.pdf'):
                 document.is_verified = True
                 document.verification_notes = "Automatically verified as PDF"
-                document.save()
+            document.save()
+            metrics.UPLOAD_SIZE.observe(document.document.size, kind='application_document')
+            # The document list is part of the receipt, so this counts as a change.
+            application.save(update_fields=['updated_at'])
             
             messages.success(request, 'Document uploaded successfully!')
             return redirect('application_details', application_id=application.id)
     
     return redirect('application_details', application_id=application.id)
 
+@login_required
+def bulk_upload_documents(request, application_id):
+    application = get_object_or_404(ApprovalApplication, pk=application_id, business__user=request.user)
+    
+    if request.method == 'POST':
+        form = BulkDocumentUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                documents, rejected = bulk_upload(application, form.cleaned_data['files'],
+                                                  form.cleaned_data['document_type'])
+            except UploadLimitExceeded as exc:
+                messages.error(request, f'Upload rejected: {exc}.')
+                return redirect('application_details', application_id=application.id)
+            
+            for document in documents:
+                metrics.UPLOAD_SIZE.observe(document.document.size, kind='application_document')
+            for name, reason in rejected:
+                messages.warning(request, f'{name} was skipped: {reason}.')
+            if documents:
+                messages.success(request, f'{len(documents)} document(s) uploaded successfully!')
+        else:
+            messages.error(request, 'Please choose a document type and at least one file.')
+    
+    return redirect('application_details', application_id=application.id)
+
+@login_required
+@require_safe
+def application_receipt(request, application_id):
+    applications = ApprovalApplication.objects.select_related('receipt')
+    if not request.user.is_staff:
+        applications = applications.filter(business__user=request.user)
+    application = get_object_or_404(applications, pk=application_id)
+    if application.status == 'draft':
+        raise Http404('Draft applications have no receipt')
+    try:
+        receipt = application.receipt
+    except ApplicationReceipt.DoesNotExist:
+        receipt = None
+    if not is_fresh(receipt, application):
+        schedule_receipt(application.id)
+        messages.info(request, 'Your receipt is being prepared. Please try again in a few moments.')
+        return redirect('application_details', application_id=application.id)
+    return serve_protected_file(request, receipt.file, as_attachment='download' in request.GET)
+
 @login_required
 def add_signature(request, document_id):
-    document = get_object_or_404(ApplicationDocument, pk=document_id, application__business__user=request.user)
+    document = get_object_or_404(
+        ApplicationDocument.objects.select_related('application'),
+        pk=document_id, application__business__user=request.user
+    )
     
     if request.method == 'POST':
         form = DigitalSignatureForm(request.POST, request.FILES)
@@ -195,14 +276,22 @@ def add_signature(request, document_id):
             signature = form.save(commit=False)
             signature.user = request.user
             signature.document = document
-            signature.save()
-            
-            document.is_verified = True
-            document.verification_notes = "Document signed by user"
-            document.save()
-            
-            messages.success(request, 'Digital signature added successfully!')
-            return redirect('application_details', application_id=document.application.id)
+            try:
+                sign_document(signature)
+            except OSError:
+                form.add_error(None, 'The document file could not be read, so it cannot be signed. '
+                                     'Please upload it again.')
+            else:
+                signature.save()
+
+                document.is_verified = True
+                document.verification_notes = "Document signed by user"
+                document.save()
+                # Verification shows on the receipt.
+                document.application.save(update_fields=['updated_at'])
+
+                messages.success(request, 'Digital signature added successfully!')
+                return redirect('application_details', application_id=document.application_id)
     else:
         form = DigitalSignatureForm()
     
@@ -211,10 +300,29 @@ def add_signature(request, document_id):
         'document': document,
     })
 
+@login_required
+@require_safe
+def download_document(request, document_id):
+    documents = ApplicationDocument.objects.all()
+    if not request.user.is_staff:
+        documents = documents.filter(application__business__user=request.user)
+    document = get_object_or_404(documents, pk=document_id)
+    return serve_protected_file(request, document.document, as_attachment='download' in request.GET)
+
 @login_required
 def government_schemes(request):
-    schemes = GovernmentScheme.objects.filter(is_active=True).order_by('-created_at')
-    return render(request, 'business_portal/government_schemes.html', {'schemes': schemes})
+    # Schemes past their end_date are left out even before expire_content
+    # has deactivated them.
+    catalog = GovernmentScheme.objects.filter(is_active=True).exclude(end_date__lt=timezone.localdate())
+    selected = SCHEME_FACETS.parse(request.GET)
+    schemes = SCHEME_FACETS.filter(catalog, selected).only(
+        'id', 'name', 'end_date', 'excerpt', 'eligibility_excerpt', 'benefits_excerpt', 'updated_at'
+    ).order_by('-created_at')
+    return render(request, 'business_portal/government_schemes.html', {
+        'schemes': schemes,
+        'facets': SCHEME_FACETS.counts(catalog, selected),
+        'selected': selected,
+    })
 
 @login_required
 def scheme_details(request, scheme_id):
@@ -254,7 +362,9 @@ def mark_compliance_complete(request, compliance_id):
 
 @login_required
 def news(request):
-    news_articles = NewsArticle.objects.filter(is_active=True).order_by('-publish_date')
+    news_articles = NewsArticle.objects.filter(is_active=True).only(
+        'id', 'title', 'image', 'excerpt', 'publish_date', 'source', 'updated_at'
+    ).order_by('-publish_date')
     return render(request, 'business_portal/news.html', {'news_articles': news_articles})
 
 @login_required
@@ -263,10 +373,11 @@ def news_detail(request, news_id):
     return render(request, 'business_portal/news_detail.html', {'article': article})
 
 @csrf_exempt
+@ratelimit(scope='status')
 def api_application_status(request, application_number):
     if request.method == 'GET':
         try:
-            application = ApprovalApplication.objects.get(application_number=application_number)
+            application = get_application_by_number(application_number, select_related=['approval_type'])
             data = {
                 'application_number': application.application_number,
                 'approval_type': application.approval_type.name,
@@ -277,4 +388,98 @@ def api_application_status(request, application_number):
             return JsonResponse(data)
         except ApprovalApplication.DoesNotExist:
             return JsonResponse({'error': 'Application not found'}, status=404)
-    return JsonResponse({'error': 'Invalid request method'}, status=400)
\ No newline at end of file
+    return JsonResponse({'error': 'Invalid request method'}, status=400)
+
+@require_POST
+def bulk_onboard(request):
+    # JSON endpoint, so answer non-staff with 403 rather than the admin login redirect.
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    try:
+        # request.body is unreadable once a multipart request's FILES are parsed.
+        if request.content_type == 'multipart/form-data':
+            upload = request.FILES.get('file')
+            if not upload:
+                raise OnboardingError('Upload the members file as "file"')
+            rows = parse_members(upload.read(), upload.name)
+        else:
+            rows = parse_members(request.body, 'members.json' if request.content_type == 'application/json' else '')
+        # Hashing happens in the request thread (a process pool would fork
+        # the web worker), so larger files with passwords go through the
+        # onboard_businesses command.
+        max_passwords = getattr(settings, 'ONBOARDING_WEB_MAX_PASSWORDS', 20)
+        if sum(1 for row in rows if row.get('password')) > max_passwords:
+            raise OnboardingError(f'At most {max_passwords} members with a password can be onboarded here; '
+                                  f'use the onboard_businesses command for more')
+        summary = onboard(rows, request.build_absolute_uri('/'),
+                          dry_run=request.GET.get('dry_run') in ('1', 'true'), workers=1)
+    except (OnboardingError, UnicodeDecodeError) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(summary, status=201 if summary['created'] else 200)
+
+@require_safe
+def ready(request):
+    # Readiness probe: warms this worker on first call if no hook did.
+    if not warmup.state['ready']:
+        warmup.warm_up()
+    if not warmup.state['ready']:
+        return JsonResponse({'status': 'warming up', 'failed': warmup.state['failed']}, status=503)
+    try:
+        warmup.open_connections()
+    except Exception:
+        return JsonResponse({'status': 'unavailable'}, status=503)
+    return JsonResponse({'status': 'ready', 'warmup_ms': warmup.state['timings']})
+
+@require_safe
+def metrics_view(request):
+    # Behind the proxy every request comes from loopback, so REMOTE_ADDR
+    # proves nothing; scrapers send METRICS_TOKEN as a bearer token.
+    if not request.user.is_staff and not metrics.authorized(request.headers.get('Authorization', '')):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@staff_member_required
+def review_queue_view(request):
+    if request.method == 'POST':
+        department = request.POST.get('department') or None
+        try:
+            count = max(1, min(int(request.POST.get('count', 1)), 50))
+        except ValueError:
+            count = 1
+        claimed = review_queue.claim(request.user, count=count, department=department)
+        if claimed:
+            messages.success(request, f'Claimed {len(claimed)} application(s) for review.')
+        else:
+            messages.info(request, 'There are no unclaimed applications in this queue.')
+        return redirect('review_queue')
+    
+    return render(request, 'business_portal/review_queue.html', {
+        'depth': review_queue.queue_depth(),
+        'claims': review_queue.held_by(request.user).select_related(
+            'business', 'approval_type').order_by('lease_expires_at'),
+        'decisions': [choice for choice in ApprovalApplication.STATUS_CHOICES
+                      if choice[0] in review_queue.DECISIONS],
+    })
+
+@staff_member_required
+@require_POST
+def review_decision(request, application_id):
+    action = request.POST.get('action')
+    if action == 'release':
+        review_queue.release(request.user, [application_id])
+        messages.info(request, 'Application returned to the queue.')
+    elif action == 'renew':
+        if review_queue.renew(request.user, [application_id]):
+            messages.success(request, 'Lease extended.')
+        else:
+            messages.error(request, 'Your lease on this application has expired.')
+    else:
+        try:
+            application = review_queue.decide(application_id, request.user, request.POST.get('status'))
+        except review_queue.LeaseLost:
+            messages.error(request, 'Your lease on this application has expired. Claim it again to continue.')
+        except ValidationError as exc:
+            messages.error(request, exc.messages[0])
+        else:
+            messages.success(request, f'{application.application_number} marked as {application.get_status_display()}.')
+    return redirect('review_queue')
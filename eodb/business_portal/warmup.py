@@ -0,0 +1,114 @@
+import importlib
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
+from django.db import connections
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+state = {'ready': False, 'timings': {}, 'failed': []}
+
+# Anonymous-safe list views whose card fragments are worth priming.
+PRIME_VIEWS = ['home', 'government_schemes', 'news', 'approval_types']
+
+
+def import_modules():
+    for module in ('views', 'forms', 'admin', 'urls', 'serving', 'ratelimit', 'reminders', 'signing', 'receipts', 'uploads', 'webhooks', 'review_queue'):
+        importlib.import_module(f'business_portal.{module}')
+    from business_portal import forms
+    # Building the form classes' bound fields and widgets once.
+    for form_class in (forms.UserRegistrationForm, forms.BusinessProfileForm,
+                       forms.ApprovalApplicationForm, forms.ApplicationDocumentForm,
+                       forms.ComplianceForm, forms.DigitalSignatureForm):
+        str(form_class())
+
+
+def template_names():
+    """Names of every business_portal template, pages and includes alike."""
+    template_dir = os.path.join(apps.get_app_config('business_portal').path, 'templates')
+    for dirpath, dirnames, filenames in os.walk(template_dir):
+        for filename in filenames:
+            if filename.endswith(('.html', '.txt')):
+                yield os.path.relpath(os.path.join(dirpath, filename), template_dir).replace(os.sep, '/')
+
+
+def compile_templates():
+    engine = engines['django']
+    count = 0
+    for name in template_names():
+        engine.get_template(name)
+        count += 1
+    return count
+
+
+def resolve_urls():
+    resolver = get_resolver()
+    count = 0
+    for name, possibilities in list(resolver.reverse_dict.lists()):
+        if not isinstance(name, str):
+            continue
+        params = possibilities[0][0][0][1]
+        try:
+            reverse(name, args=[1] * len(params))
+            count += 1
+        except NoReverseMatch:
+            pass
+    return count
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def prime_caches():
+    from business_portal import views
+    factory = RequestFactory()
+    for name in PRIME_VIEWS:
+        view = getattr(views, name)
+        view = getattr(view, '__wrapped__', view)
+        request = factory.get(reverse(name))
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        view(request)
+
+
+def warm_up():
+    """
+    Pay the per-process start-up costs before the first real request:
+    imports, template compilation, URL resolver population, database
+    connections and the template fragment cache. Safe to call repeatedly.
+    The opened connections are kept for CONN_MAX_AGE seconds, so the
+    first request of a sync worker reuses them.
+    """
+    timings, failed = {}, []
+    for step, func in (
+        ('imports', import_modules),
+        ('templates', compile_templates),
+        ('urls', resolve_urls),
+        ('database', open_connections),
+        ('caches', prime_caches),
+    ):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            logger.exception('Warm-up step %s failed', step)
+            failed.append(step)
+        timings[step] = (time.perf_counter() - start) * 1000
+    state['timings'] = timings
+    state['failed'] = failed
+    # A half-warmed worker is not ready; /ready retries on its next call.
+    state['ready'] = not failed
+    return timings
@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import math
+import random
+import ssl
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import WebhookDelivery, WebhookEvent, WebhookSubscription
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANGED = 'application.status_changed'
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def record_status_change(change):
+    """
+    Store the event and one pending delivery per matching subscription.
+    Called from the ApplicationStatusChange post_save signal, i.e. inside
+    transition_to's transaction. Nothing is written when nobody listens.
+    """
+    application = change.application
+    subscription_ids = list(
+        WebhookSubscription.objects.filter(is_active=True)
+        .filter(Q(business_id=application.business_id) | Q(approval_type_id=application.approval_type_id))
+        .values_list('id', flat=True)
+    )
+    if not subscription_ids:
+        return None
+    event = WebhookEvent.objects.create(
+        event_type=STATUS_CHANGED,
+        application_number=application.application_number,
+        created_at=change.changed_at,
+        payload={
+            'application_number': application.application_number,
+            'business_id': application.business_id,
+            'approval_type_id': application.approval_type_id,
+            'previous_status': change.from_status,
+            'status': change.to_status,
+            'changed_at': change.changed_at.isoformat(),
+        },
+    )
+    WebhookDelivery.objects.bulk_create([
+        WebhookDelivery(subscription_id=pk, event=event, next_attempt_at=change.changed_at)
+        for pk in subscription_ids
+    ])
+    return event
+
+
+def sign(secret, timestamp, body):
+    """HMAC-SHA256 over "<timestamp>.<body>", hex encoded."""
+    message = str(timestamp).encode() + b'.' + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def build_request(subscription, events):
+    body = json.dumps({
+        'events': [
+            {'id': e.id, 'type': e.event_type, 'created_at': e.created_at.isoformat(), 'data': e.payload}
+            for e in events
+        ],
+    }, separators=(',', ':')).encode()
+    timestamp = int(time.time())
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'EODB-Webhooks/1.0',
+        'X-EODB-Timestamp': str(timestamp),
+        'X-EODB-Signature': f'sha256={sign(subscription.secret, timestamp, body)}',
+    }
+    return headers, body
+
+
+async def post(url, headers, body, timeout):
+    """Minimal HTTP/1.1 POST over asyncio streams; returns the status code."""
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    context = ssl.create_default_context() if secure else None
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, port, ssl=context), timeout)
+    try:
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        host = parts.hostname if parts.port is None else f'{parts.hostname}:{parts.port}'
+        lines = [f'POST {path} HTTP/1.1', f'Host: {host}', f'Content-Length: {len(body)}', 'Connection: close']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await asyncio.wait_for(writer.drain(), timeout)
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        try:
+            return int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise ValueError(f'Malformed response: {status_line[:50]!r}')
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+async def send_batches(batches, concurrency, timeout):
+    """POST every batch, at most concurrency at a time. Returns errors (None on success)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(url, headers, body):
+        async with semaphore:
+            try:
+                status = await post(url, headers, body, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError) as exc:
+                return f'{type(exc).__name__}: {exc}'[:255]
+            return None if 200 <= status < 300 else f'HTTP {status}'
+
+    return await asyncio.gather(*(send(*batch) for batch in batches))
+
+
+def backoff(attempts):
+    """Exponential backoff with full jitter, capped at WEBHOOK_MAX_BACKOFF."""
+    base = setting('WEBHOOK_RETRY_BASE', 30)
+    ceiling = min(setting('WEBHOOK_MAX_BACKOFF', 6 * 60 * 60), base * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def round_lease(subscription_ids):
+    """
+    How long a dispatch round for these deliveries can take at worst: its
+    batches go out in waves of WEBHOOK_CONCURRENCY, and each request may
+    wait out the timeout three times (connect, send, status line).
+    """
+    batch_size = setting('WEBHOOK_BATCH_SIZE', 50)
+    timeout = setting('WEBHOOK_TIMEOUT', 10)
+    batches = sum(math.ceil(count / batch_size) for count in Counter(subscription_ids).values())
+    waves = math.ceil(batches / setting('WEBHOOK_CONCURRENCY', 10))
+    return timedelta(seconds=(waves * 3 + 1) * timeout)
+
+
+def claim_due(limit):
+    """
+    Take up to limit due deliveries for this dispatcher. Pushing their
+    next_attempt_at past the worst case for the whole round is the lease:
+    a concurrent dispatcher skips them, and if this one dies they simply
+    come due again. Returns (token, deliveries).
+    """
+    now = timezone.now()
+    due = list(
+        WebhookDelivery.objects.filter(status='pending', next_attempt_at__lte=now, subscription__is_active=True)
+        .order_by('next_attempt_at', 'id').values_list('id', 'subscription_id')[:limit]
+    )
+    if not due:
+        return None, []
+    token = uuid.uuid4()
+    ids = [pk for pk, _ in due]
+    WebhookDelivery.objects.filter(id__in=ids, status='pending', next_attempt_at__lte=now).update(
+        next_attempt_at=now + round_lease([subscription_id for _, subscription_id in due]), claim_token=token,
+    )
+    return token, list(
+        WebhookDelivery.objects.filter(claim_token=token)
+        .select_related('subscription', 'event').order_by('event__created_at', 'event_id')
+    )
+
+
+def dispatch_pending(limit=1000):
+    """
+    Deliver due events, batching up to WEBHOOK_BATCH_SIZE events per
+    subscriber into one signed POST. Returns (delivered, failed) counts.
+    """
+    token, deliveries = claim_due(limit)
+    if not deliveries:
+        return 0, 0
+    batch_size = setting('WEBHOOK_BATCH_SIZE', 50)
+    by_subscription = {}
+    for delivery in deliveries:
+        by_subscription.setdefault(delivery.subscription_id, []).append(delivery)
+    groups, requests = [], []
+    for group in by_subscription.values():
+        subscription = group[0].subscription
+        for i in range(0, len(group), batch_size):
+            chunk = group[i:i + batch_size]
+            headers, body = build_request(subscription, [d.event for d in chunk])
+            groups.append(chunk)
+            requests.append((subscription.url, headers, body))
+
+    errors = asyncio.run(send_batches(
+        requests, setting('WEBHOOK_CONCURRENCY', 10), setting('WEBHOOK_TIMEOUT', 10)))
+
+    now = timezone.now()
+    max_attempts = setting('WEBHOOK_MAX_ATTEMPTS', 8)
+    delivered, failed = [], []
+    for chunk, error in zip(groups, errors):
+        for delivery in chunk:
+            delivery.attempts += 1
+            delivery.claim_token = None
+            if error is None:
+                delivery.status = 'delivered'
+                delivery.delivered_at = now
+                delivery.last_error = ''
+                delivered.append(delivery)
+            else:
+                delivery.last_error = error
+                if delivery.attempts >= max_attempts:
+                    delivery.status = 'failed'
+                else:
+                    delivery.next_attempt_at = now + backoff(delivery.attempts)
+                failed.append(delivery)
+        if error is not None:
+            logger.warning('Webhook delivery to %s failed: %s', chunk[0].subscription.url, error)
+    # Rows another dispatcher has claimed since (or an admin retried) no
+    # longer carry the token and are left to it.
+    updated = WebhookDelivery.objects.filter(claim_token=token).bulk_update(
+        delivered + failed, ['status', 'attempts', 'next_attempt_at', 'last_error', 'delivered_at', 'claim_token'],
+        batch_size=500)
+    if updated < len(deliveries):
+        logger.warning('Lost the claim on %d webhook deliveries during dispatch', len(deliveries) - updated)
+    return len(delivered), len(failed)
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'business_portal.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +58,7 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        # Django wraps these loaders in the cached loader by default.
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -79,10 +81,94 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Concurrent writers (e.g. reviewers claiming from the review queue)
+        # wait for SQLite's write lock instead of failing after 5 seconds.
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
+        # Keep connections between requests (including the one warm-up
+        # opens), checking they still work before reusing them.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# 'default' is local to each process: fine for template fragments and
+# other values keyed on updated_at, where a worker serving its own copy for
+# a while is harmless. 'shared' is Redis when REDIS_URL is set, and then
+# also holds rate limit buckets and facet versions so every worker agrees
+# on them. Otherwise it is the database cache table (run `manage.py
+# createcachetable`), which the per-request paths deliberately avoid.
+CACHES = {
+    'default': {
+        'BACKEND': 'business_portal.metrics.InstrumentedLocMemCache',
+        'LOCATION': 'eodb-default',
+    },
+    'shared': {
+        'BACKEND': 'business_portal.metrics.InstrumentedRedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'business_portal.metrics.InstrumentedDatabaseCache',
+        'LOCATION': 'eodb_cache',
+    },
+}
+
+# Per-process metric snapshots are written here so /metrics can aggregate
+# all gunicorn workers. Unset means each process reports only itself.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+# /metrics is open to staff sessions and to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>". Unset disables token access.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Key for the HMAC that binds a DigitalSignature to the document's SHA-256.
+# Falls back to SECRET_KEY when unset.
+DOCUMENT_SIGNING_KEY = os.environ.get('DOCUMENT_SIGNING_KEY')
+
+# Application receipts are rendered by a background thread pool after commit.
+RECEIPTS_ASYNC = True
+RECEIPT_WORKERS = 2
+
+# Bulk document uploads (several files or one ZIP). Sizes are checked
+# against the decompressed bytes, not the sizes a ZIP header declares.
+BULK_UPLOAD_MAX_FILES = 20
+BULK_UPLOAD_MAX_FILE_SIZE = 10 * 1024 * 1024
+BULK_UPLOAD_MAX_TOTAL_SIZE = 50 * 1024 * 1024
+BULK_UPLOAD_MAX_RATIO = 100
+
+# How long a reviewer holds applications claimed from the review queue
+# before they return to it.
+REVIEW_LEASE_SECONDS = 15 * 60
+
+# Outbound webhooks, sent by the dispatch_webhooks command. Failed batches
+# are retried with exponential backoff (seconds) up to the attempt limit.
+WEBHOOK_BATCH_SIZE = 50
+WEBHOOK_CONCURRENCY = 10
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_RETRY_BASE = 30
+WEBHOOK_MAX_BACKOFF = 6 * 60 * 60
+WEBHOOK_MAX_ATTEMPTS = 8
+
+# News older than this is deactivated by the daily expire_content job.
+NEWS_RETENTION_DAYS = 365
+
+# Bulk onboarding of member businesses. The onboard_businesses command
+# hashes supplied passwords in a process pool (None uses every CPU); the
+# web endpoint hashes in the request thread, so it takes fewer of them.
+# Members without a password are emailed a one-time set-password link.
+ONBOARDING_MAX_ROWS = 5000
+ONBOARDING_HASH_WORKERS = None
+ONBOARDING_WEB_MAX_PASSWORDS = 20
+
+# Limit for the public status API per client IP and per API key, as token
+# buckets. With REDIS_URL set they live in Redis and hold across all
+# workers; otherwise each worker keeps its own, in memory.
+API_RATE_LIMIT = '60/m'
+# Only enable behind a proxy that sets X-Forwarded-For itself.
+RATELIMIT_TRUST_X_FORWARDED_FOR = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -130,6 +216,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Protected media (application documents) is streamed by download_document.
+# Set to 'nginx' (X-Accel-Redirect) or 'xsendfile' (X-Sendfile) to let the
+# front-end server transfer the file instead of a gunicorn worker.
+SENDFILE_BACKEND = os.environ.get('SENDFILE_BACKEND') or None
+SENDFILE_URL = '/protected-media/'
+
 # Email settings (for notifications)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import os
+
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
@@ -23,4 +25,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('business_portal.urls')),
     path('accounts/', include('django.contrib.auth.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Only public media (news images) is served directly in development.
+# Application documents go through the authorized download_document view.
+urlpatterns += static(settings.MEDIA_URL + 'news_images/', document_root=os.path.join(settings.MEDIA_ROOT, 'news_images'))
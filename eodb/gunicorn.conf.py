@@ -0,0 +1,38 @@
+# gunicorn -c gunicorn.conf.py eodb.wsgi
+wsgi_app = 'eodb.wsgi:application'
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the Django application is loaded, so the
+    # first real request does not pay for template compilation, URL
+    # resolution and database connection set-up.
+    from business_portal.warmup import state, warm_up
+    timings = warm_up()
+    if state['failed']:
+        worker.log.warning('Worker %s warm-up failed in: %s', worker.pid, ', '.join(state['failed']))
+    else:
+        worker.log.info('Worker %s warmed up in %.1f ms', worker.pid, sum(timings.values()))
+
+
+def on_starting(server):
+    # Start every master with empty metric snapshots and totals.
+    import glob
+    import os
+    directory = os.environ.get('METRICS_DIR')
+    if directory:
+        for path in glob.glob(os.path.join(directory, 'metrics_*.json')) + [os.path.join(directory, 'aggregate.json')]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def child_exit(server, worker):
+    # Runs in the master when a worker exits: its counters are kept in the
+    # aggregate so the totals on /metrics never go down.
+    import os
+    directory = os.environ.get('METRICS_DIR')
+    if directory:
+        from business_portal.metrics import retire_worker
+        try:
+            retire_worker(directory, worker.pid)
+        except OSError as exc:
+            server.log.warning('Could not keep metrics of worker %s: %s', worker.pid, exc)